@@ -3,18 +3,35 @@
 #----------------------------------------------------------------------------#
 import datetime
 import json
+import sys
 import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import click
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort, stream_with_context
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
-from sqlalchemy import func
+from datetime import timedelta
+from sqlalchemy import func, and_, or_, select, inspect, literal_column, table, column, text, event
+from sqlalchemy.orm import Session, validates
 from flask_migrate import Migrate
-import phonenumbers
+import booking
+import export
+import facets
+import genres
+import phones
+import search
+import serialize
+import streaming
+from suggest import PrefixIndex
+from loader import request_loader, reset_loaders
+from pagination import nulls_sort_high, order, paginate
+from cache import LRUCache, ResponseCache, conditional
+from metrics import Instrumentation
+from n_plus_one import NPlusOneDetector
+from formatting import format_datetime
 from wtforms.validators import ValidationError
 
 #----------------------------------------------------------------------------#
@@ -27,6 +44,9 @@ moment = Moment(app)
 app.config.from_object('config')
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+response_cache = ResponseCache(app)
+instrumentation = Instrumentation(app)
+n_plus_one = NPlusOneDetector(app)
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -41,14 +61,33 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
+    phone_e164 = db.Column(db.String(20))
     genres = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(500))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now(), index=True)
     shows = db.relationship('Show', backref='venue', lazy=True)
 
+    __table_args__ = (
+      db.Index('ix_Venue_state_city_name', 'state', 'city', 'name', 'id'),
+    )
+
+    @validates('phone')
+    def normalize_phone(self, key, phone):
+      self.phone_e164 = phones.normalize(phone)
+      return phone
+
+    @validates('genres')
+    def normalize_genres(self, key, value):
+      # the edit forms assign a list; stored as "Jazz,Blues"
+      return genres.join(value)
+
     def __repr__(self):
       return self.city
 
@@ -60,40 +99,729 @@ class Artist(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
+    phone_e164 = db.Column(db.String(20))
     genres = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now(), index=True)
     shows = db.relationship('Show', backref='artist', lazy=True)
 
+    __table_args__ = (
+      db.Index('ix_Artist_name', 'name', 'id'),
+      db.Index('ix_Artist_state_city_name', 'state', 'city', 'name', 'id'),
+    )
+
+    @validates('phone')
+    def normalize_phone(self, key, phone):
+      self.phone_e164 = phones.normalize(phone)
+      return phone
+
+    @validates('genres')
+    def normalize_genres(self, key, value):
+      # the edit forms assign a list; stored as "Jazz,Blues"
+      return genres.join(value)
+
+def default_end_time(context):
+  # for inserts that bypass the ORM (imports, generated data)
+  return context.get_current_parameters()['startTime'] + timedelta(minutes=app.config['SHOW_LENGTH_MINUTES'])
+
 class Show(db.Model):
   __tablename__ = 'Show'
 
   id = db.Column(db.Integer, primary_key=True)
   startTime = db.Column(db.DateTime, nullable=False)
+  # on postgres, exclusion constraints keep shows of one venue or one artist
+  # from overlapping (see the migrations and the Bookings section)
+  endTime = db.Column(db.DateTime, nullable=False, default=default_end_time)
   venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
   artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                         server_default=func.now(), index=True)
+
+  __table_args__ = (
+    db.Index('ix_Show_venue_id_startTime', 'venue_id', 'startTime'),
+    db.Index('ix_Show_artist_id_startTime', 'artist_id', 'startTime'),
+    db.Index('ix_Show_startTime', 'startTime', 'id'),
+  )
+
+class Genre(db.Model):
+  __tablename__ = 'Genre'
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String(120), nullable=False, unique=True)
+
+venue_genres = db.Table('venue_genres',
+  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+  db.Index('ix_venue_genres_genre_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table('artist_genres',
+  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+  db.Index('ix_artist_genres_genre_id', 'genre_id', 'artist_id'),
+)
+
 #----------------------------------------------------------------------------#
-# Filters.
+# Genres.
+#----------------------------------------------------------------------------#
+
+# The genres column stays the display value; the link tables are kept in step
+# with it on every ORM write, and relink_genres() rebuilds them after bulk
+# writes that bypass the ORM.
+
+GENRE_LINKS = {Venue: (venue_genres, 'venue_id'), Artist: (artist_genres, 'artist_id')}
+
+genre_registry = genres.registry
+genre_registry.table = Genre.__table__
+genre_registry.connect = lambda: db.engine.connect()
+
+def link_genres(connection, model, id, names):
+  links, fk = GENRE_LINKS[model]
+  connection.execute(links.delete().where(links.c[fk] == id))
+  genre_ids = genre_registry.ids(connection, names)
+  if genre_ids:
+    connection.execute(links.insert(), [{fk: id, 'genre_id': genre_id} for genre_id in genre_ids])
+
+def sync_genres(mapper, connection, target):
+  state = inspect(target)
+  if state.attrs.genres.history.has_changes():
+    # genres created in a transaction that rolls back must leave the registry
+    state.session.info['genres_written'] = True
+    link_genres(connection, mapper.class_, target.id, genres.split(target.genres))
+
+def unlink_genres(mapper, connection, target):
+  # ON DELETE CASCADE does the same where foreign keys are enforced
+  links, fk = GENRE_LINKS[mapper.class_]
+  connection.execute(links.delete().where(links.c[fk] == target.id))
+
+for model in GENRE_LINKS:
+  event.listen(model, 'after_insert', sync_genres)
+  event.listen(model, 'after_update', sync_genres)
+  event.listen(model, 'before_delete', unlink_genres)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def reset_genre_registry(session, previous_transaction):
+  if session.info.pop('genres_written', False):
+    genre_registry.reset()
+
+def relink_genres(model, ids=None, batch_size=10000):
+  # rebuild the links of `ids` (a list or subquery; all rows when None) from
+  # the genres column
+  links, fk = GENRE_LINKS[model]
+  connection = db.session.connection()
+  delete = links.delete()
+  query = db.session.query(model.id, model.genres)
+  if ids is not None:
+    delete = delete.where(links.c[fk].in_(ids))
+    query = query.filter(model.id.in_(ids))
+  connection.execute(delete)
+  rows = []
+  for id, value in query.all():
+    names = genres.split(value)
+    rows.extend({fk: id, 'genre_id': genre_id} for genre_id in genre_registry.ids(connection, names))
+    if len(rows) >= batch_size:
+      connection.execute(links.insert(), rows)
+      rows = []
+  if rows:
+    connection.execute(links.insert(), rows)
+
+def genre_filter(model, names):
+  # rows having every genre in `names`, through the (genre_id, <fk>) index
+  links, fk = GENRE_LINKS[model]
+  for name in names:
+    yield model.id.in_(db.session.query(links.c[fk]).join(Genre, Genre.id == links.c.genre_id)
+                       .filter(Genre.name == name))
+
+def genre_counts(state=None, city=None):
+  # venues and artists per genre, optionally within a state/city, in one query
+  def counted(model):
+    links, fk = GENRE_LINKS[model]
+    query = db.session.query(func.count(links.c[fk])).filter(links.c.genre_id == Genre.id)
+    if state or city:
+      query = query.join(model, model.id == links.c[fk])
+      if state:
+        query = query.filter(model.state == state)
+      if city:
+        query = query.filter(model.city == city)
+    return query.correlate(Genre).scalar_subquery()
+  return db.session.query(Genre.name, counted(Venue).label('venues'), counted(Artist).label('artists')) \
+    .order_by(Genre.name)
+
+#----------------------------------------------------------------------------#
+# Suggestions.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+suggestions = PrefixIndex(app.config['SUGGEST_MAX_ENTRIES'])
+SUGGEST_KINDS = {Venue: 'venue', Artist: 'artist'}
+
+def load_suggestions():
+  suggestions.rebuild(
+    (kind, id, name)
+    for model, kind in SUGGEST_KINDS.items()
+    for id, name in db.session.query(model.id, model.name).yield_per(1000)
+  )
+
+# Writes are collected per session during the flush and applied to the index
+# once the transaction commits, so a rollback leaves it untouched.
+
+def pending_suggestions(target):
+  return inspect(target).session.info.setdefault('suggestions', {})
+
+def index_suggestion(mapper, connection, target):
+  pending_suggestions(target)[(SUGGEST_KINDS[mapper.class_], target.id)] = target.name
+
+def unindex_suggestion(mapper, connection, target):
+  pending_suggestions(target)[(SUGGEST_KINDS[mapper.class_], target.id)] = None
+
+for model in SUGGEST_KINDS:
+  event.listen(model, 'after_insert', index_suggestion)
+  event.listen(model, 'after_update', index_suggestion)
+  event.listen(model, 'after_delete', unindex_suggestion)
+
+@event.listens_for(Session, 'after_commit')
+def apply_suggestions(session):
+  for (kind, id), name in session.info.pop('suggestions', {}).items():
+    if name is None:
+      suggestions.remove(kind, id)
+    else:
+      suggestions.add(kind, id, name)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_suggestions(session, previous_transaction):
+  session.info.pop('suggestions', None)
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Venue/Artist.upcoming_shows_count and past_shows_count are denormalized from
+# Show. Inserts through the ORM adjust them in the same flush and deletes
+# recount the venue and artist (a show that has started but not been rolled
+# over yet is still counted as upcoming); `flask rollover-shows` moves shows whose start time has passed from upcoming
+# to past, and `flask check-counters` recomputes everything to report drift.
+
+COUNTED_BY = ((Venue, Show.venue_id), (Artist, Show.artist_id))
+
+def show_counter_column(model, start_time, now=None):
+  if start_time > (now or datetime.now()):
+    return model.upcoming_shows_count
+  return model.past_shows_count
+
+def adjust_show_counters(connection, show, delta):
+  for model, show_fk in COUNTED_BY:
+    counter = show_counter_column(model, show.startTime)
+    connection.execute(model.__table__.update()
+      .where(model.__table__.c.id == getattr(show, show_fk.key))
+      .values({counter.key: counter + delta}))
+
+def count_inserted_show(mapper, connection, target):
+  adjust_show_counters(connection, target, 1)
+
+def count_deleted_show(mapper, connection, target):
+  now = datetime.now()
+  for model, show_fk in COUNTED_BY:
+    recount_shows(model, show_fk, now, [getattr(target, show_fk.key)], connection)
+
+event.listen(Show, 'after_insert', count_inserted_show)
+event.listen(Show, 'after_delete', count_deleted_show)
+
+def recount_shows(model, show_fk, now, ids=None, connection=None):
+  # set-based recount from Show; `ids` (a list or subquery) limits the rows
+  # touched. Inside a flush, pass the flush's connection.
+  def counted(predicate):
+    return db.session.query(func.count(Show.id)) \
+      .filter(show_fk == model.id, predicate).correlate(model).scalar_subquery()
+  update = model.__table__.update().values({
+    model.upcoming_shows_count.key: counted(Show.startTime > now),
+    model.past_shows_count.key: counted(Show.startTime <= now),
+  })
+  if ids is not None:
+    update = update.where(model.__table__.c.id.in_(ids))
+  return (connection or db.session).execute(update).rowcount
+
+def actual_show_counts(model, show_fk, now):
+  # (id, stored upcoming, stored past, actual upcoming, actual past) per row
+  return db.session.query(
+      model.id, model.upcoming_shows_count, model.past_shows_count,
+      func.count(Show.id).filter(Show.startTime > now),
+      func.count(Show.id).filter(Show.startTime <= now)
+    ).outerjoin(Show, show_fk == model.id).group_by(model.id)
+
+@app.cli.command('rollover-shows')
+def rollover_shows():
+  # run at least once per SHOW_ROLLOVER_WINDOW; overlapping runs are harmless
+  # because the touched rows are recounted rather than decremented
+  now = datetime.now()
+  since = now - timedelta(seconds=app.config['SHOW_ROLLOVER_WINDOW'])
+  for model, show_fk in COUNTED_BY:
+    started = db.session.query(show_fk).filter(Show.startTime > since, Show.startTime <= now)
+    print('%s: %d recounted' % (model.__tablename__, recount_shows(model, show_fk, now, started)))
+  db.session.commit()
+
+@app.cli.command('check-counters')
+@click.option('--fix', is_flag=True, help='Recount the rows that drifted.')
+def check_show_counters(fix):
+  now = datetime.now()
+  drifted = False
+  for model, show_fk in COUNTED_BY:
+    drift = [row for row in actual_show_counts(model, show_fk, now) if row[1:3] != row[3:5]]
+    for id, upcoming, past, actual_upcoming, actual_past in drift:
+      print('%s %d: upcoming %d (actual %d), past %d (actual %d)' % (
+        model.__tablename__, id, upcoming, actual_upcoming, past, actual_past))
+    print('%s: %d rows drifted' % (model.__tablename__, len(drift)))
+    if drift and fix:
+      recount_shows(model, show_fk, now, [row[0] for row in drift])
+    drifted = drifted or bool(drift)
+  db.session.commit()
+  if drifted and not fix:
+    sys.exit(1)
+
+#----------------------------------------------------------------------------#
+# Bookings.
+#----------------------------------------------------------------------------#
+
+# A venue or an artist can be in one show at a time (see booking.py). Every
+# ORM insert or rescheduling of a show is checked in the flush, against the
+# database and against the shows checked before it in the same flush (which
+# may not have been written yet); bulk inserts check their rows with
+# booking.Bookings.
+
+def show_length():
+  return timedelta(minutes=app.config['SHOW_LENGTH_MINUTES'])
+
+def max_show_length():
+  return timedelta(minutes=app.config['SHOW_MAX_LENGTH_MINUTES'])
+
+def booked_between(start, end):
+  return booking.overlaps(Show.startTime, Show.endTime, start, end, max_show_length())
+
+def booking_conflicts(connection, venue_id, artist_id, start, end, exclude=None):
+  # ids of the shows holding the venue or the artist somewhere in [start, end)
+  query = select(Show.id).where(or_(and_(Show.venue_id == venue_id, booked_between(start, end)),
+                                    and_(Show.artist_id == artist_id, booked_between(start, end))))
+  if exclude is not None:
+    query = query.where(Show.id != exclude)
+  return [id for id, in connection.execute(query)]
+
+def check_booking(mapper, connection, target):
+  state = inspect(target)
+  if state.has_identity and not any(state.attrs[name].history.has_changes()
+                                    for name in ('startTime', 'endTime', 'venue_id', 'artist_id')):
+    return
+  if target.endTime is None:
+    target.endTime = target.startTime + show_length()
+  booking.check_length(target.startTime, target.endTime, max_show_length())
+  conflicts = booking_conflicts(connection, target.venue_id, target.artist_id,
+                                target.startTime, target.endTime, target.id)
+  if conflicts:
+    raise booking.BookingError('the venue or the artist is already booked then (show %s)'
+                               % ', '.join(str(id) for id in conflicts), conflicts)
+  flushed = state.session.info.setdefault('bookings', booking.Bookings(max_show_length()))
+  owners = (('venue', target.venue_id), ('artist', target.artist_id))
+  if any(flushed.conflicts(owner, target.startTime, target.endTime) for owner in owners):
+    raise booking.BookingError('the venue or the artist is already booked then (by another new show)')
+  for owner in owners:
+    flushed.add(owner, target.startTime, target.endTime)
+
+event.listen(Show, 'before_insert', check_booking)
+event.listen(Show, 'before_update', check_booking)
+
+@event.listens_for(Session, 'after_flush')
+def reset_flush_bookings(session, flush_context):
+  session.info.pop('bookings', None)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_flush_bookings(session, previous_transaction):
+  session.info.pop('bookings', None)
+
+def free_slots(artist_id, city, start, end, length):
+  # for every venue in `city`, the stretches of [start, end) at least `length`
+  # long in which neither the venue nor the artist is booked: two bounded
+  # range scans (the artist's shows, the city's venues' shows) instead of a
+  # pass over all shows
+  venues = db.session.query(Venue.id, Venue.name).filter(Venue.city == city).order_by(Venue.name, Venue.id).all()
+  busy = db.session.query(Show.venue_id, Show.artist_id, Show.startTime, Show.endTime)
+  rows = busy.filter(Show.artist_id == artist_id, booked_between(start, end)).union_all(
+    busy.filter(Show.venue_id.in_([id for id, _ in venues]), booked_between(start, end)))
+  artist_busy, venue_busy = [], {}
+  for venue_id, show_artist_id, show_start, show_end in rows:
+    if show_artist_id == artist_id:
+      artist_busy.append((show_start, show_end))
+    venue_busy.setdefault(venue_id, []).append((show_start, show_end))
+  return [{
+    "venue_id": venue_id,
+    "venue_name": name,
+    "slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end
+              in booking.gaps(artist_busy + venue_busy.get(venue_id, []), start, end, length)]
+  } for venue_id, name in venues]
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Cached pages are tagged with what they show (see the views); a committed
+# change evicts exactly the tags it affects:
+#   venue:<id> / artist:<id>          the detail page
+#   venue-ref:<id> / artist-ref:<id>  detail pages of the other side listing it
+#   venues / artists / shows          the listing pages
+
+def cache_tags_for(obj):
+  if isinstance(obj, Show):
+    return ['venue:%s' % obj.venue_id, 'artist:%s' % obj.artist_id, 'shows']
+  if isinstance(obj, Venue):
+    return ['venue:%s' % obj.id, 'venue-ref:%s' % obj.id, 'venues', 'shows']
+  if isinstance(obj, Artist):
+    return ['artist:%s' % obj.id, 'artist-ref:%s' % obj.id, 'artists', 'shows']
+  return []
+
+@event.listens_for(Session, 'after_flush')
+def collect_cache_tags(session, flush_context):
+  tags = session.info.setdefault('cache_tags', set())
+  for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+    tags.update(cache_tags_for(obj))
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cache_tags(session):
+  response_cache.invalidate(session.info.pop('cache_tags', None))
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_cache_tags(session, previous_transaction):
+  session.info.pop('cache_tags', None)
+
+#----------------------------------------------------------------------------#
+# Version stamps.
+#----------------------------------------------------------------------------#
+
+# Cheap per-page stamps for conditional GETs, each a single statement of index
+# lookups. Rows only change through updated_at (counter updates and show
+# deletes touch the parent Venue/Artist too); row counts catch deletes on the
+# listings and the upcoming-show count catches shows passing into the past.
+
+def version_stamp(*queries):
+  return db.session.query(*(query.scalar_subquery() for query in queries)).one()
+
+def venues_stamp():
+  return version_stamp(db.session.query(func.max(Venue.updated_at)),
+                       db.session.query(func.count(Venue.id)))
+
+def artists_stamp():
+  return version_stamp(db.session.query(func.max(Artist.updated_at)),
+                       db.session.query(func.count(Artist.id)))
+
+def shows_stamp():
+  return version_stamp(db.session.query(func.max(Show.updated_at)),
+                       db.session.query(func.max(Venue.updated_at)),
+                       db.session.query(func.max(Artist.updated_at)))
+
+def detail_stamp(model, show_fk, other, other_fk, id):
+  return version_stamp(
+    db.session.query(func.max(model.updated_at)).filter(model.id == id),
+    db.session.query(func.max(Show.updated_at)).filter(show_fk == id),
+    db.session.query(func.count(Show.id)).filter(show_fk == id, Show.startTime > datetime.now()),
+    db.session.query(func.max(other.updated_at)).join(Show, other_fk == other.id).filter(show_fk == id))
+
+def venue_stamp(venue_id):
+  return detail_stamp(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+def artist_stamp(artist_id):
+  return detail_stamp(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
 
 app.jinja_env.filters['datetime'] = format_datetime
 
 def phone_validation(number):
-  parsed_num = phonenumbers.parse(number, "US")
-  if not phonenumbers.is_valid_number(parsed_num):
+  if not phones.is_valid(number):
     raise ValidationError('Invalid phone number.')
 
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+def load_by_id(model):
+  # request-scoped loader for `model` instances by primary key: prime() the ids
+  # needed, then load() them; whatever is pending is fetched with one IN query
+  return request_loader(model.__tablename__,
+                        lambda ids: {obj.id: obj for obj in model.query.filter(model.id.in_(ids))})
+
+app.teardown_request(reset_loaders)
+
+def page_size():
+  per_page = request.args.get('per_page', app.config['PAGE_SIZE'], type=int)
+  return max(1, min(per_page, app.config['MAX_PAGE_SIZE']))
+
+def request_page(query, columns, key):
+  try:
+    return paginate(query, columns, key, request.args.get('cursor'), page_size())
+  except ValueError:
+    abort(400)
+
+def pager(page):
+  links = {}
+  for name, cursor in (('prev', page.prev_cursor), ('next', page.next_cursor)):
+    if cursor:
+      args = dict(request.view_args, **request.args.to_dict(flat=False))
+      args['cursor'] = cursor
+      links[name] = url_for(request.endpoint, **args)
+  return links
+
+def streaming_requested():
+  return request.args.get('stream', int(app.config['STREAM_LISTINGS']), type=int) == 1
+
+def listing(query, columns, key):
+  # a page of rows plus pager links, or with ?stream=1 every row through a
+  # server-side cursor that is only consumed while the template renders
+  if streaming_requested():
+    return streaming.stream(query.order_by(*columns), app.config['STREAM_BATCH_SIZE']), {}
+  page = request_page(query, columns, key)
+  return page.items, pager(page)
+
+def render_listing(template_name, **context):
+  if not streaming_requested():
+    return render_template(template_name, **context)
+  app.update_template_context(context)
+  template = app.jinja_env.get_template(template_name)
+  return Response(stream_with_context(template.generate(context)))
+
+VENUE_AREA_ORDER = [Venue.state, Venue.city, Venue.name, Venue.id]
+
+def venue_area_query():
+  # upcoming counts are read from the denormalized counter, so this is a plain
+  # range scan over ix_Venue_state_city_name
+  return db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count)
+
+def venue_area_rows(criteria=()):
+  # ordering by (state, city) keeps each area contiguous so group_areas() can
+  # fold the rows in a single pass
+  return listing(venue_area_query().filter(*criteria), VENUE_AREA_ORDER,
+                 lambda row: (row.state, row.city, row.name, row.id))
+
+AreaVenue = streaming.record('AreaVenue', ('id', 'name', 'num_upcoming_shows'))
+
+def group_areas(rows):
+  area = None
+  for venue_id, name, city, state, num_upcoming_shows in rows:
+    if area is None or (area['state'], area['city']) != (state, city):
+      if area is not None:
+        yield area
+      area = {
+        "city": city,
+        "state": state,
+        "venues": []
+      }
+    area['venues'].append(AreaVenue(venue_id, name, num_upcoming_shows))
+  if area is not None:
+    yield area
+
+def browse_facets(model):
+  # state, city, genre, seeking and has-upcoming-shows facets of /venues or /artists
+  links, fk = GENRE_LINKS[model]
+  if model is Venue:
+    seeking = facets.Facet('seeking', 'Seeking', facets.flag(Venue.seeking_talent == True),
+                           labels={'1': 'Seeking talent'})
+  else:
+    seeking = facets.Facet('seeking', 'Seeking', facets.flag(Artist.seeking_venue == True),
+                           labels={'1': 'Seeking a venue'})
+  return [
+    facets.Facet('state', 'State', model.state),
+    facets.Facet('city', 'City', model.city),
+    facets.Facet('genre', 'Genre', Genre.name, multiple=True,
+                 join=lambda query: query.join(links, links.c[fk] == model.id)
+                                         .join(Genre, Genre.id == links.c.genre_id),
+                 filter=lambda names: genre_filter(model, names)),
+    seeking,
+    facets.Facet('upcoming', 'Shows', facets.flag(model.upcoming_shows_count > 0),
+                 labels={'1': 'Has upcoming shows'}),
+  ]
+
+def browse(model):
+  # the page's facet counts depend on every row and on the show counters, so
+  # any venue/artist or show write evicts it
+  response_cache.tag(model.__tablename__.lower() + 's', 'shows')
+  return facets.browse(db.session, model, browse_facets(model), app.config['FACET_LIMIT'])
+
+def detail_shows_query(show_fk, owner_id, other, upcoming):
+  other_fk = Show.artist_id if other is Artist else Show.venue_id
+  now = datetime.now()
+  query = db.session.query(other_fk, other.name, other.image_link, Show.startTime) \
+    .join(other, other_fk == other.id) \
+    .filter(show_fk == owner_id)
+  if upcoming:
+    return query.filter(Show.startTime > now).order_by(Show.startTime, Show.id)
+  return query.filter(Show.startTime <= now).order_by(Show.startTime.desc(), Show.id.desc())
+
+DETAIL_SHOWS = {
+  other: streaming.record(other.__name__ + 'Show', ('%s_id' % prefix, '%s_name' % prefix,
+                                                    '%s_image_link' % prefix, 'start_time'))
+  for other, prefix in ((Venue, 'venue'), (Artist, 'artist'))
+}
+
+def detail_shows(show_fk, owner_id, other, upcoming):
+  # shows of one venue (or artist) with just the columns the detail page needs
+  # from the other side; past/upcoming is split by the WHERE clause
+  query = detail_shows_query(show_fk, owner_id, other, upcoming)
+  return list(streaming.records(DETAIL_SHOWS[other], query))
+
+SHOW_FIELDS = ('id', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time')
+ShowRecord = streaming.record('ShowRecord', SHOW_FIELDS)
+
+def show_record(row):
+  # one row of show_listing_query() as used by /shows and the API
+  return ShowRecord(row.id, row.venue_id, row.venue_name, row.artist_id, row.artist_name,
+                    row.artist_image_link, row.startTime)
+
+VENUE_FIELDS = ('id', 'name', 'genres', 'address', 'city', 'state', 'phone', 'website', 'facebook_link',
+                'seeking_talent', 'seeking_description', 'image_link')
+ARTIST_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'phone', 'website', 'facebook_link',
+                 'seeking_venue', 'seeking_description', 'image_link')
+
+def detail_data(entity, fields, show_fk, other):
+  # a venue (or artist) with its upcoming and past shows, for the detail page
+  upcoming_shows = detail_shows(show_fk, entity.id, other, upcoming=True)
+  past_shows = detail_shows(show_fk, entity.id, other, upcoming=False)
+  data = {name: getattr(entity, name) for name in fields}
+  data.update({
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows)
+  })
+  return data
+
+def show_listing_query():
+  return db.session.query(
+      Show.id, Show.startTime, Show.venue_id, Venue.name.label('venue_name'),
+      Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+
+def show_time(value):
+  # Show times are naive local times (compared with datetime.now()); a value
+  # with a UTC offset is converted to one
+  moment = datetime.fromisoformat(value)
+  if moment.tzinfo is not None:
+    moment = moment.astimezone().replace(tzinfo=None)
+  return moment
+
+def show_window(args):
+  # ?from= (inclusive) and ?to= (exclusive) as ISO dates or datetimes, with or
+  # without a UTC offset; a bare date means its midnight. Raises ValueError
+  # when malformed.
+  return tuple(show_time(args[name]) if args.get(name) else None for name in ('from', 'to'))
+
+def show_criteria(args, window=None):
+  # the window bounds Show.startTime, so the listing is a range scan over
+  # ix_Show_startTime, or over ix_Show_venue_id_startTime /
+  # ix_Show_artist_id_startTime with ?venue= / ?artist=; ?city= narrows to the
+  # shows of that city's venues
+  start, end = window or show_window(args)
+  criteria = []
+  if start is not None:
+    criteria.append(Show.startTime >= start)
+  if end is not None:
+    criteria.append(Show.startTime < end)
+  for name, show_fk in (('venue', Show.venue_id), ('artist', Show.artist_id)):
+    if args.get(name):
+      criteria.append(show_fk == int(args[name]))
+  if args.get('city'):
+    criteria.append(Show.venue_id.in_(db.session.query(Venue.id).filter(Venue.city == args['city'])))
+  return criteria
+
+CALENDAR_SPANS = {'day': 31, 'week': 7 * 12, 'month': 366}
+
+def calendar_bucket(unit):
+  # the first day of the day, week (from Monday) or month a show starts in
+  if db.engine.dialect.name == 'postgresql':
+    return func.to_char(func.date_trunc(unit, Show.startTime), 'YYYY-MM-DD')
+  if unit == 'day':
+    return func.date(Show.startTime)
+  if unit == 'week':
+    return func.date(Show.startTime, '-6 days', 'weekday 1')
+  return func.strftime('%Y-%m-01', Show.startTime)
+
+def show_calendar(unit, criteria):
+  # grouped by position: postgres would not match the bucket's bound
+  # parameters in GROUP BY against those in the select list
+  return db.session.query(calendar_bucket(unit).label('start'), func.count(Show.id).label('count')) \
+    .filter(*criteria).group_by(text('1')).order_by(text('1'))
+
+# "Tonight" is the most requested view at peak. Its rows are kept per city for
+# TONIGHT_CACHE_TTL seconds; nothing invalidates them, the short TTL bounds
+# how stale they get.
+tonight_cache = LRUCache(app.config['TONIGHT_CACHE_SIZE'], app.config['TONIGHT_CACHE_TTL'])
+
+def tonight_window(now):
+  # from the start of the current hour to TONIGHT_ENDS_AT the next morning
+  start = now.replace(minute=0, second=0, microsecond=0)
+  end = start.replace(hour=app.config['TONIGHT_ENDS_AT'])
+  if end <= start:
+    end += timedelta(days=1)
+  return start, end
+
+def tonight_shows(city):
+  start, end = tonight_window(datetime.now())
+  key = (city, start)
+  shows = tonight_cache.get(key)
+  if shows is None:
+    rows = show_listing_query() \
+      .filter(Venue.city == city, Show.startTime >= start, Show.startTime < end) \
+      .order_by(Show.startTime, Show.id)
+    shows = [show_record(row) for row in rows]
+    tonight_cache.set(key, shows)
+  return shows
+
+_fts_tables = {}
+
+def has_fts_table(model):
+  name = search.fts5_table(model.__tablename__)
+  if name not in _fts_tables:
+    _fts_tables[name] = inspect(db.engine).has_table(name)
+  return _fts_tables[name]
+
+def search_matches(model, search_term):
+  # ranked full-text match on name, city, state and genres: tsvector + GIN on
+  # postgres, FTS5 on sqlite, plain ilike when neither index is available.
+  # ORDER BY rank has to rank every row it is given, so the first
+  # SEARCH_CANDIDATE_LIMIT matches are picked without ordering and only those
+  # are ranked; a term matching more rows than that ranks a sample of them.
+  query = db.session.query(model.id, model.name, model.upcoming_shows_count)
+  dialect = db.engine.dialect.name
+  candidate_limit = app.config['SEARCH_CANDIDATE_LIMIT']
+  if search.terms(search_term) and dialect == 'postgresql':
+    vector = literal_column('"%s".search_vector' % model.__tablename__)
+    ts_query = func.to_tsquery('simple', search.tsquery(search_term))
+    candidates = db.session.query(model.id).filter(vector.op('@@')(ts_query)) \
+      .limit(candidate_limit).subquery()
+    query = query.join(candidates, candidates.c.id == model.id) \
+      .order_by(func.ts_rank(vector, ts_query).desc(), model.id)
+  elif search.terms(search_term) and dialect == 'sqlite' and has_fts_table(model):
+    fts = table(search.fts5_table(model.__tablename__), column('rowid'), column('rank'))
+    candidates = db.session.query(fts.c.rowid, fts.c.rank) \
+      .filter(literal_column('"%s"' % fts.name).op('MATCH')(search.fts5_query(search_term))) \
+      .limit(candidate_limit).subquery()
+    query = query.join(candidates, candidates.c.rowid == model.id).order_by(candidates.c.rank, model.id)
+  else:
+    query = query.filter(model.name.ilike('%' + search_term + '%')).order_by(model.name, model.id)
+  return query.limit(app.config['SEARCH_RESULTS_LIMIT']).all()
+
+SearchResult = streaming.record('SearchResult', ('id', 'name', 'num_upcoming_shows'))
+
+def search_results(model, search_term):
+  # at most SEARCH_RESULTS_LIMIT rows, fetched at once for the count
+  matches = search_matches(model, search_term)
+  return {
+    "count": len(matches),
+    "data": streaming.records(SearchResult, matches)
+  }
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -107,94 +835,30 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@conditional(venues_stamp)
+@response_cache.cached
 def venues():
-  city_state_pair = Venue.query.with_entities(func.count(Venue.id), Venue.city, Venue.state).group_by(Venue.city, Venue.state).all()
-  print(city_state_pair)
-  data=[]
-  for pair in city_state_pair:
-    venues = Venue.query.filter(Venue.city==pair[1]).all()
-    venues_data = []
-    for venue in venues:
-      venues_data.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": len(Show.query.filter(Show.venue_id==venue.id).filter(Show.startTime>datetime.now()).all())
-      })
-    data.append({
-      "city":pair[1],
-      "state": pair[2],
-      "venues": venues_data
-    })
-  return render_template('pages/venues.html', areas=data);
+  browsing = browse(Venue)
+  rows, links = venue_area_rows(browsing.criteria)
+  return render_listing('pages/venues.html', areas=group_areas(rows), pager=links, browse=browsing)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
-    search_term = request.form.get('search_term')
-    result = Venue.query.filter(Venue.name.ilike('%'+search_term+'%')).all()
-    data = []
-    for venue in result:
-      upcoming_shows = Show.query.filter(Show.venue_id == venue.id).filter(Show.startTime > datetime.now()).all()
-      data.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": len(upcoming_shows) 
-      })
-
-    response = {
-        "count": len(result),
-        "data": data
-    }
-    return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+    search_term = request.form.get('search_term', '')
+    response = search_results(Venue, search_term)
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 @app.route('/venues/<int:venue_id>')
+@conditional(venue_stamp)
+@response_cache.cached
 def show_venue(venue_id):
-
-  venue = Venue.query.get(venue_id)
-
+  response_cache.tag('venue:%s' % venue_id)
+  venue = load_by_id(Venue).load(venue_id)
   if not venue:
       return render_template('errors/404.html')
 
-  venue_shows = db.session.query(Show).join(Artist).filter(Show.venue_id == venue_id).all()
-
-  current_time = datetime.now()
-  past_shows = []
-  upcoming_shows = []
-
-  for show in venue_shows:
-      if show.start_time < current_time:
-          past_shows.append({
-              "artist_id": show.artist_id,
-              "artist_name": show.artist.name,
-              "artist_image_link": show.artist.image_link,
-              "start_time": show.start_time.strftime(' %y-%m-%d  %H:%M:%S ')
-          })
-      else:
-          upcoming_shows.append({
-              "artist_id": show.artist_id,
-              "artist_name": show.artist.name,
-              "artist_image_link": show.artist.image_link,
-              "start_time": show.start_time.strftime(' %y-%m-%d  %H:%M:%S ')
-          })
-
-  data = {
-      "id": venue.id,
-      "name": venue.name,
-      "genres": venue.genres,
-      "address": venue.address,
-      "city": venue.city,
-      "state": venue.state,
-      "phone": venue.phone,
-      "website": venue.website,
-      "facebook_link": venue.facebook_link,
-      "seeking_talent": venue.seeking_talent,
-      "seeking_description": venue.seeking_description,
-      "image_link": venue.image_link,
-      "past_shows": past_shows,
-      "upcoming_shows": upcoming_shows,
-      "past_shows_count": len(past_shows),
-      "upcoming_shows_count": len(upcoming_shows)
-  }
-
+  data = detail_data(venue, VENUE_FIELDS, Show.venue_id, Artist)
+  response_cache.tag(*('artist-ref:%s' % show.artist_id for show in data['upcoming_shows'] + data['past_shows']))
   return render_template('pages/show_venue.html', venue=data)
 
 
@@ -226,8 +890,8 @@ def create_venue_submission():
                      seeking_description=seeking_description, image_link = image_link ,website =website , facebook_link=facebook_link)
         db.session.add(venue)
         db.session.commit()
-    except Exception as e :
-        print(e)
+    except Exception:
+        app.logger.exception('could not create venue')
         error= True
         db.session.rollback()
     finally:
@@ -244,9 +908,9 @@ def delete_venue(venue_id):
     try:
       venue = Venue.query.get(venue_id)
       db.session.delete(venue)
-      db.commit()
-    except Exception as e :
-        print(e)
+      db.session.commit()
+    except Exception:
+        app.logger.exception('could not delete venue %s', venue_id)
         error= True
         db.session.rollback()
     finally:
@@ -260,70 +924,33 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@conditional(artists_stamp)
+@response_cache.cached
 def artists():
-  data = Artist.query.all()
-  return render_template('pages/artists.html', artists=data)
+  browsing = browse(Artist)
+  rows, links = listing(db.session.query(Artist.id, Artist.name).filter(*browsing.criteria),
+                        [Artist.name, Artist.id], lambda row: (row.name, row.id))
+  return render_listing('pages/artists.html', artists=rows, pager=links, browse=browsing)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-    result = Artist.query.filter(Artist.name.ilike(f"%{request.form.get('search_term')}%")).all()
-    response = {
-        "count": len(result),
-        "data": result
-    }
-    return render_template('pages/search_artists.html', results=response,
-                           search_term=request.form.get('search_term', ''))
+    search_term = request.form.get('search_term', '')
+    response = search_results(Artist, search_term)
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
+@conditional(artist_stamp)
+@response_cache.cached
 def show_artist(artist_id):
-  artist = Artist.query.get(artist_id)
+  response_cache.tag('artist:%s' % artist_id)
+  artist = load_by_id(Artist).load(artist_id)
   if not artist:
       return render_template('errors/404.html')
 
-  artist_shows = db.session.query(Show).join(Venue).filter(Show.artist_id == artist_id).all()
-
-  current_time = datetime.now()
-  past_shows = []
-  upcoming_shows = []
-
-
-  for show in artist_shows:
-      if show.start_time < current_time:
-          past_shows.append({
-              "venue_id": show.venue_id,
-              "venue_name": show.venue.name,
-              "venue_image_link": show.venue.image_link,
-              "start_time": show.start_time.strftime(' %y-%m-%d  %H:%M:%S ')
-          })
-      else:
-          upcoming_shows.append({
-              "venue_id": show.venue_id,
-              "venue_name": show.venue.name,
-              "venue_image_link": show.venue.image_link,
-              "start_time": show.start_time.strftime(' %y-%m-%d  %H:%M:%S ')
-          })
-
-
-  data = {
-      "id": artist.id,
-      "name": artist.name,
-      "genres": artist.genres,
-      "city": artist.city,
-      "state": artist.state,
-      "phone": artist.phone,
-      "website": artist.website,
-      "facebook_link": artist.facebook_link,
-      "seeking_venue": artist.seeking_venue,
-      "seeking_description": artist.seeking_description,
-      "image_link": artist.image_link,
-      "past_shows": past_shows,
-      "upcoming_shows": upcoming_shows,
-      "past_shows_count": len(past_shows),
-      "upcoming_shows_count": len(upcoming_shows)
-  }
+  data = detail_data(artist, ARTIST_FIELDS, Show.artist_id, Venue)
+  response_cache.tag(*('venue-ref:%s' % show.venue_id for show in data['upcoming_shows'] + data['past_shows']))
   return render_template('pages/show_artist.html', artist=data)
 
-
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
@@ -498,19 +1125,22 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@conditional(shows_stamp)
+@response_cache.cached
 def shows():
-  shows = Show.query.join(Venue).join(Artist).all()
-  data = []
-  for show in shows:
-    data.append({
-      "venue_id": show.venue_id,
-      "venue_name": show.venue.name,
-      "artist_id": show.artist_id,
-      "artist_name": show.artist.name, 
-      "artist_image_link": show.artist.image_link,
-      "start_time": str(show.startTime)
-    })
-  return render_template('pages/shows.html', shows=data)
+  # ?from=, ?to=, ?venue=, ?artist= and ?city= select a window (see show_criteria)
+  response_cache.tag('shows')
+  try:
+    criteria = show_criteria(request.args)
+  except (ValueError, TypeError):
+    abort(400)
+  rows, links = listing(show_listing_query().filter(*criteria), [Show.startTime, Show.id],
+                        lambda row: (row.startTime, row.id))
+  return render_listing('pages/shows.html', shows=map(show_record, rows), pager=links)
+
+@app.route('/shows/tonight/<city>')
+def shows_tonight(city):
+  return render_template('pages/shows.html', shows=tonight_shows(city), pager={}, city=city)
 
 @app.route('/shows/create')
 def create_shows():
@@ -520,26 +1150,464 @@ def create_shows():
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-    error=False
+    message='show added'
     try:
+      end_time = request.form.get('end_time')
       show = Show(
         artist_id=request.form.get('artist_id'),
         venue_id =request.form.get('venue_id'),
-        startTime= request.form.get('start_time'),
+        startTime= dateutil.parser.parse(request.form.get('start_time')),
+        endTime= dateutil.parser.parse(end_time) if end_time else None,
       )
       db.session.add(show)
       db.session.commit()
-    except:
-        error=True
+    except booking.BookingError as e:
+        message=str(e)
+        db.session.rollback()
+    except Exception:
+        app.logger.exception('could not create show')
+        message='error'
         db.session.rollback()
     finally:
         db.session.close()
-        if error:
-            flash('error')
-        else:
-            flash('show added')
+        flash(message)
     return render_template('pages/home.html')
 
+@app.route('/search/suggest')
+def search_suggest():
+  if not suggestions.loaded:
+    load_suggestions()
+  limit = min(request.args.get('limit', 10, type=int), 50)
+  return jsonify(data=suggestions.suggest(request.args.get('q', ''), limit))
+
+#  Export
+#  ----------------------------------------------------------------
+
+EXPORT_MODELS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+@app.route('/export/<any(venues, artists, shows):kind>.<any(csv, ndjson):format>')
+def export_catalog(kind, format):
+  # the whole table (or with ?since= the rows changed after that UTC time) in
+  # (updated_at, id) order; X-Export-Until is the since= for the next run.
+  # Deletes are not visible to incremental exports.
+  model = EXPORT_MODELS[kind]
+  try:
+    since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+  except ValueError:
+    abort(400)
+  until = db.session.query(func.max(model.updated_at)).scalar()
+  columns = list(model.__table__.columns)
+  query = db.session.query(*columns)
+  if until is not None:
+    query = query.filter(model.updated_at <= until)
+  if since is not None:
+    query = query.filter(model.updated_at > since)
+  rows = streaming.stream(query.order_by(model.updated_at, model.id), app.config['STREAM_BATCH_SIZE'])
+
+  encode, mimetype = export.FORMATS[format]
+  body = export.chunked(encode([column.key for column in columns], rows))
+  headers = {
+    'Content-Disposition': 'attachment; filename=%s.%s' % (kind, format),
+    'Vary': 'Accept-Encoding',
+  }
+  if until is not None:
+    headers['X-Export-Until'] = until.isoformat()
+  gzip = request.args.get('gzip', int(app.config['EXPORT_GZIP']), type=int) == 1
+  if gzip and request.accept_encodings['gzip']:
+    body = export.gzipped(body)
+    headers['Content-Encoding'] = 'gzip'
+  return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+#  API
+#  ----------------------------------------------------------------
+
+# /api/v1 serves the same data as the pages above as JSON. ?fields=a,b selects
+# only those columns (id is always included), ?include= adds related data for a
+# whole page at once: upcoming and past shows for venues and artists (one
+# query), the venue and artist of shows (one query per type through the
+# request loaders). Lists are keyset paginated by id with the same ?cursor= /
+# ?per_page= as the HTML listings; venues and artists can be filtered with
+# ?state=, ?city= and (repeatable, all must match) ?genre=, shows with the
+# same ?from= / ?to= / ?venue= / ?artist= / ?city= as /shows.
+
+def api_columns(model):
+  return {column.key: getattr(model, column.key) for column in model.__table__.columns}
+
+API_FIELDS = {
+  Venue: (api_columns(Venue), VENUE_FIELDS + ('upcoming_shows_count', 'past_shows_count')),
+  Artist: (api_columns(Artist), ARTIST_FIELDS + ('upcoming_shows_count', 'past_shows_count')),
+  Show: (dict(api_columns(Show), start_time=Show.startTime, end_time=Show.endTime, venue_name=Venue.name,
+              artist_name=Artist.name, artist_image_link=Artist.image_link), SHOW_FIELDS),
+}
+API_INCLUDES = {Venue: ('shows',), Artist: ('shows',), Show: ('venue', 'artist')}
+SHOWS_BY = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+def api_response(payload, status=200):
+  return Response(serialize.dumps(payload), status=status, mimetype='application/json')
+
+def api_error(status, message):
+  abort(api_response({"error": message}, status))
+
+def api_includes(model):
+  includes = [name for name in request.args.get('include', '').split(',') if name]
+  unknown = [name for name in includes if name not in API_INCLUDES[model]]
+  if unknown:
+    api_error(400, 'unknown include: ' + ', '.join(unknown))
+  return includes
+
+def api_query(model, includes):
+  available, default = API_FIELDS[model]
+  requested = request.args.get('fields')
+  names = [name.strip() for name in requested.split(',') if name.strip()] if requested else default
+  unknown = [name for name in names if name not in available]
+  if unknown:
+    api_error(400, 'unknown fields: ' + ', '.join(unknown))
+  # included venues/artists are looked up by their foreign key
+  keys = [name + '_id' for name in includes if name in ('venue', 'artist')]
+  names = list(dict.fromkeys(['id'] + keys + list(names)))
+  query = db.session.query(*(available[name].label(name) for name in names)).select_from(model)
+  if model is Show:
+    # join only the side(s) whose columns were asked for
+    for other, other_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+      if any(available[name].class_ is other for name in names):
+        query = query.join(other, other_fk == other.id)
+  return query
+
+def included_shows(show_fk, ids):
+  # upcoming and past shows of all `ids` in one query
+  now = datetime.now()
+  shows = {id: {"upcoming_shows": [], "past_shows": []} for id in ids}
+  if ids:
+    query = show_listing_query().filter(show_fk.in_(ids)).order_by(Show.startTime, Show.id)
+    for row in query:
+      shows[getattr(row, show_fk.key)]['upcoming_shows' if row.startTime > now else 'past_shows'].append(show_record(row))
+  for item in shows.values():
+    item['past_shows'].reverse()
+  return shows
+
+def api_items(model, rows, includes):
+  items = [row._asdict() for row in rows]
+  if 'shows' in includes:
+    shows = included_shows(SHOWS_BY[model], [item['id'] for item in items])
+    for item in items:
+      item.update(shows[item['id']])
+  for name, other in (('venue', Venue), ('artist', Artist)):
+    if name in includes:
+      loader = load_by_id(other)
+      loader.prime(item[name + '_id'] for item in items)
+      for item in items:
+        related = loader.load(item[name + '_id'])
+        item[name] = {field: getattr(related, field) for field in API_FIELDS[other][1]}
+  return items
+
+def api_filters(model, query):
+  if model is Show:
+    try:
+      return query.filter(*show_criteria(request.args))
+    except (ValueError, TypeError):
+      api_error(400, 'invalid filter')
+  for name in ('state', 'city'):
+    if request.args.get(name):
+      query = query.filter(getattr(model, name) == request.args[name])
+  return query.filter(*genre_filter(model, request.args.getlist('genre')))
+
+def api_list(model):
+  includes = api_includes(model)
+  try:
+    page = paginate(api_filters(model, api_query(model, includes)), [model.id], lambda row: (row.id,),
+                    request.args.get('cursor'), page_size())
+  except ValueError:
+    api_error(400, 'invalid cursor')
+  return api_response({"data": api_items(model, page.items, includes), "links": pager(page)})
+
+def api_detail(model, id):
+  includes = api_includes(model)
+  row = api_query(model, includes).filter(model.id == id).one_or_none()
+  if row is None:
+    api_error(404, 'not found')
+  return api_response({"data": api_items(model, [row], includes)[0]})
+
+def venues_api_stamp():
+  return tuple(venues_stamp()) + tuple(shows_stamp())
+
+def artists_api_stamp():
+  return tuple(artists_stamp()) + tuple(shows_stamp())
+
+def genres_stamp():
+  return tuple(venues_stamp()) + tuple(artists_stamp())
+
+def show_calendar_stamp(unit):
+  return shows_stamp()
+
+def show_stamp(show_id):
+  return version_stamp(db.session.query(func.max(Show.updated_at)).filter(Show.id == show_id),
+                       db.session.query(func.max(Venue.updated_at)).join(Show, Show.venue_id == Venue.id)
+                         .filter(Show.id == show_id),
+                       db.session.query(func.max(Artist.updated_at)).join(Show, Show.artist_id == Artist.id)
+                         .filter(Show.id == show_id))
+
+@app.route('/api/v1/venues')
+@conditional(venues_api_stamp)
+def api_venues():
+  return api_list(Venue)
+
+@app.route('/api/v1/venues/<int:venue_id>')
+@conditional(venue_stamp)
+def api_venue(venue_id):
+  return api_detail(Venue, venue_id)
+
+@app.route('/api/v1/artists')
+@conditional(artists_api_stamp)
+def api_artists():
+  return api_list(Artist)
+
+@app.route('/api/v1/artists/<int:artist_id>')
+@conditional(artist_stamp)
+def api_artist(artist_id):
+  return api_detail(Artist, artist_id)
+
+@app.route('/api/v1/artists/<int:artist_id>/free-slots')
+def api_artist_free_slots(artist_id):
+  # ?city= (required), ?from= / ?to= (default: the next FREE_SLOTS_MAX_DAYS
+  # days from the coming hour) and ?length= in minutes (default
+  # SHOW_LENGTH_MINUTES)
+  if load_by_id(Artist).load(artist_id) is None:
+    api_error(404, 'not found')
+  if not request.args.get('city'):
+    api_error(400, 'city is required')
+  try:
+    start, end = show_window(request.args)
+    start = start or datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    end = end or start + timedelta(days=app.config['FREE_SLOTS_MAX_DAYS'])
+    length = timedelta(minutes=int(request.args.get('length', app.config['SHOW_LENGTH_MINUTES'])))
+  except (ValueError, TypeError):
+    api_error(400, 'invalid filter')
+  if not start < end <= start + timedelta(days=app.config['FREE_SLOTS_MAX_DAYS']):
+    api_error(400, 'window must be between 1 and %d days' % app.config['FREE_SLOTS_MAX_DAYS'])
+  if not timedelta(0) < length <= max_show_length():
+    api_error(400, 'invalid length')
+  slots = free_slots(artist_id, request.args['city'], start, end, length)
+  return api_response({"data": slots, "from": start, "to": end})
+
+@app.route('/api/v1/shows')
+@conditional(shows_stamp)
+def api_shows():
+  return api_list(Show)
+
+@app.route('/api/v1/shows/<int:show_id>')
+@conditional(show_stamp)
+def api_show(show_id):
+  return api_detail(Show, show_id)
+
+@app.route('/api/v1/shows/calendar/<any(day, week, month):unit>')
+@conditional(show_calendar_stamp)
+def api_show_calendar(unit):
+  # shows per bucket in [?from, ?to) with the /shows filters; the window
+  # defaults to CALENDAR_SPANS[unit] days from today and is capped at
+  # CALENDAR_MAX_DAYS. Buckets without shows are left out.
+  try:
+    start, end = show_window(request.args)
+    start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = end or start + timedelta(days=CALENDAR_SPANS[unit])
+    criteria = show_criteria(request.args, (start, end))
+  except (ValueError, TypeError):
+    api_error(400, 'invalid filter')
+  if not start < end <= start + timedelta(days=app.config['CALENDAR_MAX_DAYS']):
+    api_error(400, 'window must be between 1 and %d days' % app.config['CALENDAR_MAX_DAYS'])
+  buckets = show_calendar(unit, criteria)
+  return api_response({"data": [row._asdict() for row in buckets], "from": start, "to": end})
+
+@app.route('/api/v1/shows/tonight/<city>')
+def api_shows_tonight(city):
+  return api_response({"data": tonight_shows(city)})
+
+@app.route('/api/v1/genres')
+@conditional(genres_stamp)
+def api_genres():
+  # facet counts: venues and artists per genre, within ?state= / ?city=
+  counts = genre_counts(request.args.get('state'), request.args.get('city'))
+  return api_response({"data": [row._asdict() for row in counts]})
+
+#  Search index
+#  ----------------------------------------------------------------
+
+@app.cli.command('search-index')
+def create_search_index():
+  # postgres gets its tsvector columns from the migrations; this is for sqlite
+  # databases created with db.create_all()
+  if db.engine.dialect.name != 'sqlite':
+    print('search index is managed by migrations on ' + db.engine.dialect.name)
+    return
+  with db.engine.begin() as connection:
+    for model in (Venue, Artist):
+      for statement in search.fts5_ddl(model.__tablename__):
+        connection.execute(text(statement))
+  _fts_tables.clear()
+
+@app.cli.command('genre-index')
+def rebuild_genre_index():
+  # after writes that bypassed the ORM (imports, generated data)
+  for model in GENRE_LINKS:
+    relink_genres(model)
+  db.session.commit()
+
+@app.cli.command('suggest-index')
+def rebuild_suggest_index():
+  load_suggestions()
+  print('indexed %d keys%s' % (len(suggestions), ' (truncated)' if suggestions.truncated else ''))
+
+#  Query plans
+#  ----------------------------------------------------------------
+
+def query_plan(query):
+  dialect = db.engine.dialect.name
+  compiled = query.statement.compile(dialect=db.engine.dialect,
+                                     compile_kwargs={'render_postcompile': True})
+  params = compiled.params
+  if compiled.positional:
+    params = [params[name] for name in compiled.positiontup]
+  connection = db.engine.raw_connection()
+  try:
+    cursor = connection.cursor()
+    if dialect == 'postgresql':
+      # tiny dev tables make a seq scan the cheapest plan; ask what the planner
+      # would use if it had to avoid one
+      cursor.execute('SET enable_seqscan = off')
+      cursor.execute('EXPLAIN ' + str(compiled), params)
+    else:
+      cursor.execute('EXPLAIN QUERY PLAN ' + str(compiled), params)
+    return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+  finally:
+    connection.close()
+
+def sequential_scans(plan):
+  scans = []
+  for line in plan:
+    if 'Seq Scan' in line:
+      scans.append(line.strip())
+    elif ' SCAN ' in ' %s ' % line and 'INDEX' not in line and 'INTEGER PRIMARY KEY' not in line:
+      scans.append(line.strip())
+  return scans
+
+def hot_queries():
+  per_page = app.config['PAGE_SIZE']
+  # the first page, ordered the way paginate() orders it
+  nulls_high = nulls_sort_high(db.session)
+  return {
+    'venue areas': venue_area_query().order_by(*order(VENUE_AREA_ORDER, True, nulls_high)).limit(per_page),
+    'artists': db.session.query(Artist.id, Artist.name)
+      .order_by(*order([Artist.name, Artist.id], True, nulls_high)).limit(per_page),
+    'shows': show_listing_query().order_by(Show.startTime, Show.id).limit(per_page),
+    'venue upcoming shows': detail_shows_query(Show.venue_id, 1, Artist, upcoming=True),
+    'venue past shows': detail_shows_query(Show.venue_id, 1, Artist, upcoming=False),
+    'artist upcoming shows': detail_shows_query(Show.artist_id, 1, Venue, upcoming=True),
+    'artist past shows': detail_shows_query(Show.artist_id, 1, Venue, upcoming=False),
+    'artists in a city': db.session.query(Artist.id, Artist.name)
+      .filter(Artist.state == 'CA', Artist.city == 'San Francisco').order_by(Artist.name, Artist.id)
+      .limit(per_page),
+    'shows in a window': show_listing_query().filter(*show_criteria({'from': '2026-01-01', 'to': '2026-02-01'}))
+      .order_by(Show.startTime, Show.id).limit(per_page),
+    'venue shows in a window': show_listing_query()
+      .filter(*show_criteria({'from': '2026-01-01', 'to': '2026-02-01', 'venue': '1'}))
+      .order_by(Show.startTime, Show.id).limit(per_page),
+    'show calendar': show_calendar('day', show_criteria({'from': '2026-01-01', 'to': '2026-02-01'})),
+    'booking check': db.session.query(Show.id).filter(or_(
+      and_(Show.venue_id == 1, booked_between(datetime(2026, 1, 1, 20), datetime(2026, 1, 1, 22))),
+      and_(Show.artist_id == 1, booked_between(datetime(2026, 1, 1, 20), datetime(2026, 1, 1, 22))))),
+    'venues by genre': db.session.query(Venue.id, Venue.name).filter(*genre_filter(Venue, ['Jazz']))
+      .order_by(Venue.id).limit(per_page),
+  }
+
+@app.cli.command('check-plans')
+def check_query_plans():
+  # exits non-zero when a hot query falls back to a full table scan
+  failed = False
+  for name, query in hot_queries().items():
+    scans = sequential_scans(query_plan(query))
+    print('%-24s %s' % (name, 'ok' if not scans else 'SEQUENTIAL SCAN'))
+    for scan in scans:
+      print('    ' + scan)
+    failed = failed or bool(scans)
+  if failed:
+    sys.exit(1)
+
+#  Query budgets
+#  ----------------------------------------------------------------
+
+# Statement budgets per endpoint are set in config.py (QUERY_BUDGETS); the
+# instrumentation logs requests that go over them, and `flask check-budgets`
+# requests each read endpoint against the current database and fails when a
+# change makes it issue more (an N+1 regression, typically).
+
+def budget_urls():
+  venue_id = db.session.query(func.min(Venue.id)).scalar() or 1
+  artist_id = db.session.query(func.min(Artist.id)).scalar() or 1
+  show_id = db.session.query(func.min(Show.id)).scalar() or 1
+  city = db.session.query(Venue.city).filter(Venue.id == venue_id).scalar() or 'San Francisco'
+  today = datetime.now().date().isoformat()
+  return [
+    ('venues', url_for('venues')),
+    ('artists', url_for('artists')),
+    ('artists', url_for('artists', genre='Jazz', upcoming=1)),
+    ('shows', url_for('shows')),
+    ('shows', url_for('shows', city=city, **{'from': today})),
+    ('shows_tonight', url_for('shows_tonight', city=city)),
+    ('show_venue', url_for('show_venue', venue_id=venue_id)),
+    ('show_artist', url_for('show_artist', artist_id=artist_id)),
+    ('api_venues', url_for('api_venues', include='shows')),
+    ('api_venue', url_for('api_venue', venue_id=venue_id, include='shows')),
+    ('api_artists', url_for('api_artists', include='shows')),
+    ('api_artist', url_for('api_artist', artist_id=artist_id, include='shows')),
+    ('api_shows', url_for('api_shows', include='venue,artist')),
+    ('api_show', url_for('api_show', show_id=show_id, include='venue,artist')),
+    ('api_show_calendar', url_for('api_show_calendar', unit='week', venue=venue_id)),
+    ('api_shows_tonight', url_for('api_shows_tonight', city=city)),
+    ('api_artist_free_slots', url_for('api_artist_free_slots', artist_id=artist_id, city=city)),
+  ]
+
+@app.cli.command('check-budgets')
+def check_query_budgets():
+  # exits non-zero when an endpoint issues more statements than its budget
+  with app.test_request_context():
+    urls = budget_urls()
+  statements = []
+  def count(*args):
+    statements.append(args[2])
+  enabled, response_cache.enabled = response_cache.enabled, False
+  event.listen(db.engine, 'before_cursor_execute', count)
+  failed = False
+  try:
+    for endpoint, url in urls:
+      del statements[:]
+      response = app.test_client().get(url)
+      response.close()
+      budget = app.config['QUERY_BUDGETS'].get(endpoint, app.config['QUERY_BUDGET'])
+      over = len(statements) > budget
+      print('%-48s %3d / %-3d %s' % (url, len(statements), budget, 'OVER BUDGET' if over else 'ok'))
+      failed = failed or over
+  finally:
+    event.remove(db.engine, 'before_cursor_execute', count)
+    response_cache.enabled = enabled
+  if failed:
+    sys.exit(1)
+
+#  Bulk import
+#  ----------------------------------------------------------------
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows validated and committed together.')
+@click.option('--rejects', type=click.Path(dir_okay=False), help='Where to write rejected rows (NDJSON).')
+@click.option('--resume', is_flag=True, help='Continue from the checkpoint of an interrupted run.')
+def import_records(kind, source, chunk_size, rejects, resume):
+  # CSV (with a header row) or NDJSON, one record per row
+  import importer
+  inserted, rejected = importer.run(kind, source, chunk_size, rejects, resume)
+  print('done: %d inserted, %d rejected' % (inserted, rejected))
+  if kind != 'shows':
+    load_suggestions()
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -0,0 +1,448 @@
+import argparse
+import json
+import random
+import re
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import babel.dates
+import dateutil.parser
+from flask import url_for
+from sqlalchemy import event
+
+from app import app, db, Venue, Artist, Show, response_cache, suggestions, load_suggestions
+from formatting import format_datetime, _format_datetime
+import synthetic
+
+# Benchmarks against the database configured in config.py (DATABASE_URL).
+#
+#   python benchmark.py generate --venues 10000 --artists 100000 --shows 1000000
+#   python benchmark.py routes --requests 100 --output before.json
+#   python benchmark.py load --base-url http://localhost:5000 --concurrency 16 --duration 30
+#   python benchmark.py compare before.json after.json
+#   python benchmark.py suggest --prefix ja --prefix the --repeat 200
+#   python benchmark.py stream --url /shows --url /artists
+#   python benchmark.py memory --sizes 1000 10000 100000 1000000 --url /shows
+#   python benchmark.py format --rows 5000 --distinct 500
+
+
+def ilike_suggest(prefix, limit=10):
+    results = []
+    for model, kind in ((Venue, 'venue'), (Artist, 'artist')):
+        rows = db.session.query(model.id, model.name) \
+            .filter(model.name.ilike(prefix + '%')) \
+            .order_by(model.name).limit(limit).all()
+        results.extend({"type": kind, "id": id, "name": name} for id, name in rows)
+    return results[:limit]
+
+
+def bench_suggest(prefixes, repeat):
+    load_suggestions()
+    print('prefix index: %d keys' % len(suggestions))
+    for prefix in prefixes:
+        index_time = timeit.timeit(lambda: suggestions.suggest(prefix), number=repeat) / repeat
+        ilike_time = timeit.timeit(lambda: ilike_suggest(prefix), number=repeat) / repeat
+        print('%-12s index %8.1f us   ilike %8.1f us   %6.1fx' % (
+            prefix, index_time * 1e6, ilike_time * 1e6, ilike_time / index_time))
+
+
+def measure_response(url):
+    # time to first byte and total time for one GET, plus peak traced memory
+    client = app.test_client()
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks, b''))
+    first_byte = time.perf_counter() - started
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "url": url,
+        "status": response.status_code,
+        "bytes": size,
+        "ttfb_ms": round(first_byte * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+        "peak_traced_mb": round(peak / 2 ** 20, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+    }
+
+
+def bench_stream(urls):
+    # stream=0 renders one buffered page of MAX_PAGE_SIZE rows, stream=1 renders
+    # every row; each run gets its own process so peak RSS is not inherited
+    for url in urls:
+        for mode in ('0', '1'):
+            separator = '&' if '?' in url else '?'
+            target = url + separator + 'stream=' + mode + '&per_page=' + str(app.config['MAX_PAGE_SIZE'])
+            result = run_json(['measure', target])
+            print('%-40s ttfb %9.1f ms  total %9.1f ms  traced %8.1f MB  rss %8.1f MB' % (
+                target, result['ttfb_ms'], result['total_ms'], result['peak_traced_mb'], result['peak_rss_mb']))
+
+
+def run_json(arguments, env=None):
+    output = subprocess.check_output([sys.executable, __file__] + arguments, env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def bench_memory(sizes, urls, seed):
+    # every url streamed in full over catalogs of growing size, each in a
+    # fresh SQLite database and every measurement in its own process; peak
+    # memory should stay flat while the total time grows with the rows
+    directory = tempfile.mkdtemp(prefix='fyyur-memory-')
+    try:
+        for size in sizes:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(directory, 'catalog-%d.db' % size))
+            subprocess.check_call([sys.executable, __file__, 'generate', '--create', '--seed', str(seed),
+                                   '--venues', str(max(10, size // 100)), '--artists', str(max(10, size // 10)),
+                                   '--shows', str(size)], env=env, stdout=subprocess.DEVNULL)
+            for url in urls:
+                target = url + ('&' if '?' in url else '?') + 'stream=1'
+                result = run_json(['measure', target], env)
+                print('%9d shows  %-32s total %9.1f ms  %8.1f MB out  traced %6.1f MB  rss %6.1f MB' % (
+                    size, url, result['total_ms'], result['bytes'] / 2 ** 20, result['peak_traced_mb'],
+                    result['peak_rss_mb']))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def legacy_format_datetime(value, format='medium'):
+    # the filter as it was before formatting.py, for comparison
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def bench_format(rows, distinct, repeat):
+    # one "page" of `rows` start times drawn from `distinct` values
+    start = datetime(2026, 1, 1, 20, 0)
+    values = [start + timedelta(hours=i % distinct) for i in range(rows)]
+    strings = [str(value) for value in values]
+
+    def legacy():
+        for value in strings:
+            legacy_format_datetime(value, 'full')
+
+    def current():
+        for value in values:
+            format_datetime(value, 'full')
+
+    def cold():
+        _format_datetime.cache_clear()
+        current()
+
+    for name, run in (('legacy', legacy), ('cold cache', cold), ('warm cache', current)):
+        elapsed = timeit.timeit(run, number=repeat) / repeat
+        print('%-12s %8.2f ms per page  %6.2f us per row' % (name, elapsed * 1000, elapsed / rows * 1e6))
+
+
+def bench_generate(venues, artists, shows, seed, batch_size, create):
+    if create:
+        db.create_all()
+    started = time.perf_counter()
+    synthetic.generate(venues, artists, shows, seed, batch_size,
+                       progress=lambda message: print(message, end='\r', flush=True))
+    print('\ngenerated in %.1f s' % (time.perf_counter() - started))
+
+
+# Routes that only read but are POSTed to, with the form they need. Every
+# other non-GET route writes and is left out.
+READ_POSTS = {
+    'search_venues': lambda rng: {'search_term': rng.choice(synthetic.WORDS).lower()},
+    'search_artists': lambda rng: {'search_term': rng.choice(synthetic.WORDS).lower()},
+}
+
+
+def sample_ids(model, limit=1000):
+    # the lowest ids are the popular ones in a generated catalog
+    return [id for id, in db.session.query(model.id).order_by(model.id).limit(limit)] or [1]
+
+
+def url_pools(seed, size=100):
+    # for every readable route, `size` (url, method, form) tuples with ids
+    # drawn from the catalog
+    rng = random.Random(seed)
+    ids = {'venue_id': sample_ids(Venue), 'artist_id': sample_ids(Artist), 'show_id': sample_ids(Show)}
+    arguments = {
+        'kind': lambda: rng.choice(('venues', 'artists', 'shows')),
+        'format': lambda: rng.choice(('csv', 'ndjson')),
+        'unit': lambda: rng.choice(('day', 'week', 'month')),
+        'city': lambda: synthetic.CITIES[synthetic.skewed(rng, len(synthetic.CITIES), 2.0)][0],
+    }
+    arguments.update((name, lambda values=values: values[synthetic.skewed(rng, len(values))])
+                     for name, values in ids.items())
+    # keep exports to a day of changes
+    query = {'export_catalog': {'since': (datetime.utcnow() - timedelta(days=1)).isoformat()}}
+    pools = {}
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint):
+            if rule.endpoint == 'static' or rule.endpoint in pools:
+                continue
+            method = 'GET' if 'GET' in rule.methods else 'POST' if rule.endpoint in READ_POSTS else None
+            if method is None or not set(rule.arguments) <= set(arguments):
+                continue
+            pools[rule.endpoint] = [(
+                url_for(rule.endpoint, **dict(query.get(rule.endpoint, {}),
+                                              **{name: arguments[name]() for name in rule.arguments})),
+                method,
+                READ_POSTS[rule.endpoint](rng) if method == 'POST' else None,
+            ) for _ in range(size)]
+    return pools
+
+
+def percentile(ordered, fraction):
+    # nearest rank
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize(timings, queries, errors, elapsed):
+    ordered = sorted(timings)
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "throughput_rps": round(len(timings) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+        "mean_queries": round(sum(queries) / len(queries), 2) if queries else None,
+        "max_queries": max(queries) if queries else None,
+    }
+
+
+def fetch(client, url, method, data):
+    # in debug mode the test client re-raises view errors; count them as 500s
+    try:
+        response = client.open(url, method=method, data=data)
+    except Exception:
+        db.session.rollback()
+        return 500
+    response.get_data()
+    response.close()
+    return response.status_code
+
+
+def bench_routes(pools, requests, seed):
+    # every route in turn through the test client, in this process
+    rng = random.Random(seed)
+    client = app.test_client()
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    results = {}
+    try:
+        for endpoint, pool in sorted(pools.items()):
+            fetch(client, *pool[0])
+            timings, queries, errors = [], [], 0
+            for _ in range(requests):
+                statements[0] = 0
+                started = time.perf_counter()
+                status = fetch(client, *rng.choice(pool))
+                timings.append(time.perf_counter() - started)
+                queries.append(statements[0])
+                errors += status >= 500
+            results[endpoint] = summarize(timings, queries, errors, sum(timings))
+            print_result(endpoint, results[endpoint])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return results
+
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def bench_load(pools, base_url, concurrency, duration, seed):
+    # `concurrency` threads issuing requests for `duration` seconds against a
+    # running server, each picking a random route; query counts come from the
+    # Server-Timing header
+    samples = dict((endpoint, ([], [], [0])) for endpoint in pools)
+    endpoints = sorted(pools)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(rng):
+        while time.perf_counter() < deadline:
+            endpoint = rng.choice(endpoints)
+            url, method, data = rng.choice(pools[endpoint])
+            body = urlencode(data).encode('ascii') if data is not None else None
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(base_url.rstrip('/') + url, data=body, method=method)) as response:
+                    response.read()
+                    status, timing = response.status, response.headers.get('Server-Timing', '')
+            except HTTPError as e:
+                status, timing = e.code, e.headers.get('Server-Timing', '')
+            elapsed = time.perf_counter() - started
+            match = SERVER_TIMING_QUERIES.search(timing)
+            timings, queries, errors = samples[endpoint]
+            with lock:
+                timings.append(elapsed)
+                if match:
+                    queries.append(int(match.group(1)))
+                errors[0] += status >= 500
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(random.Random(seed + i),)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    results = {}
+    for endpoint in endpoints:
+        timings, queries, errors = samples[endpoint]
+        if timings:
+            results[endpoint] = summarize(timings, queries, errors[0], elapsed)
+            print_result(endpoint, results[endpoint])
+    return results
+
+
+def print_result(endpoint, result):
+    print('%-24s %6d req %4d err  p50 %8.2f  p95 %8.2f  p99 %8.2f ms  %8.1f req/s  %5.1f queries' % (
+        endpoint, result['requests'], result['errors'], result['p50_ms'] or 0, result['p95_ms'] or 0,
+        result['p99_ms'] or 0, result['throughput_rps'] or 0, result['mean_queries'] or 0))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, mode, settings, routes):
+    commit = git_commit()
+    report = {
+        "mode": mode,
+        "commit": commit,
+        "created": datetime.utcnow().isoformat(),
+        "database": db.engine.dialect.name,
+        "catalog": {
+            "venues": db.session.query(db.func.count(Venue.id)).scalar(),
+            "artists": db.session.query(db.func.count(Artist.id)).scalar(),
+            "shows": db.session.query(db.func.count(Show.id)).scalar(),
+        },
+        "settings": settings,
+        "routes": routes,
+    }
+    path = path or 'benchmark-%s-%s.json' % (mode, commit or 'unknown')
+    with open(path, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print('results written to ' + path)
+
+
+def compare(before_path, after_path):
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print('%s (%s) -> %s (%s)' % (before_path, before['commit'], after_path, after['commit']))
+    for endpoint in sorted(set(before['routes']) & set(after['routes'])):
+        old, new = before['routes'][endpoint], after['routes'][endpoint]
+        changes = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_queries'):
+            if old[key] and new[key] is not None:
+                changes.append('%s %8.2f -> %8.2f (%+6.1f%%)' % (
+                    key[:-3] if key.endswith('_ms') else 'queries', old[key], new[key],
+                    (new[key] - old[key]) / old[key] * 100))
+        print('%-24s %s' % (endpoint, '  '.join(changes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fyyur benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    suggest = commands.add_parser('suggest', help='prefix index vs. ilike for /search/suggest')
+    suggest.add_argument('--prefix', action='append', default=[])
+    suggest.add_argument('--repeat', type=int, default=100)
+    stream = commands.add_parser('stream', help='buffered vs. streamed listing pages: TTFB and peak memory')
+    stream.add_argument('--url', action='append', default=[])
+    memory = commands.add_parser('memory', help='peak memory of streamed pages and exports by catalog size')
+    memory.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help='shows per catalog')
+    memory.add_argument('--url', action='append', default=[])
+    memory.add_argument('--seed', type=int, default=0)
+    fmt = commands.add_parser('format', help='datetime filter: legacy vs. cached formatter')
+    fmt.add_argument('--rows', type=int, default=5000)
+    fmt.add_argument('--distinct', type=int, default=500)
+    fmt.add_argument('--repeat', type=int, default=10)
+    measure = commands.add_parser('measure', help='measure a single GET and print it as JSON')
+    measure.add_argument('url')
+    generate = commands.add_parser('generate', help='fill the database with a synthetic catalog')
+    generate.add_argument('--venues', type=int, default=10000)
+    generate.add_argument('--artists', type=int, default=100000)
+    generate.add_argument('--shows', type=int, default=1000000)
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--batch-size', type=int, default=10000)
+    generate.add_argument('--create', action='store_true', help='create missing tables first (db.create_all)')
+    routes = commands.add_parser('routes', help='latency and query counts of every readable route, in process')
+    routes.add_argument('--requests', type=int, default=100, help='requests per route')
+    routes.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    routes.add_argument('--seed', type=int, default=0)
+    routes.add_argument('--output')
+    load = commands.add_parser('load', help='concurrent HTTP load against a running server')
+    load.add_argument('--base-url', default='http://localhost:5000')
+    load.add_argument('--concurrency', type=int, default=8)
+    load.add_argument('--duration', type=float, default=30)
+    load.add_argument('--seed', type=int, default=0)
+    load.add_argument('--output')
+    comparison = commands.add_parser('compare', help='compare two saved result files')
+    comparison.add_argument('before')
+    comparison.add_argument('after')
+    args = parser.parse_args()
+
+    # call-site tracking would dominate the timings
+    app.config['N_PLUS_ONE_DETECTION'] = False
+    with app.app_context():
+        if args.command == 'generate':
+            bench_generate(args.venues, args.artists, args.shows, args.seed, args.batch_size, args.create)
+        elif args.command == 'routes':
+            response_cache.enabled = response_cache.enabled and not args.no_cache
+            results = bench_routes(url_pools(args.seed), args.requests, args.seed)
+            save_results(args.output, 'routes', {"requests": args.requests, "cache": response_cache.enabled,
+                                                 "seed": args.seed}, results)
+        elif args.command == 'load':
+            results = bench_load(url_pools(args.seed), args.base_url, args.concurrency, args.duration, args.seed)
+            save_results(args.output, 'load', {"base_url": args.base_url, "concurrency": args.concurrency,
+                                               "duration": args.duration, "seed": args.seed}, results)
+        elif args.command == 'compare':
+            compare(args.before, args.after)
+        elif args.command == 'suggest':
+            bench_suggest(args.prefix or ['a', 'the', 'mus'], args.repeat)
+        elif args.command == 'stream':
+            bench_stream(args.url or ['/shows', '/artists', '/venues'])
+        elif args.command == 'memory':
+            bench_memory(args.sizes, args.url or ['/shows', '/export/shows.ndjson'], args.seed)
+        elif args.command == 'format':
+            bench_format(args.rows, args.distinct, args.repeat)
+        elif args.command == 'measure':
+            print(json.dumps(measure_response(args.url)))
+        else:
+            parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+from bisect import bisect_left, bisect_right, insort
+
+from sqlalchemy import and_
+
+# Show bookings.
+#
+# A show holds its venue and its artist from startTime to endTime. No show is
+# longer than a fixed maximum, so every show overlapping [start, end) starts in
+# (start - maximum, end): a range of bounded width on the (venue_id, startTime)
+# and (artist_id, startTime) indexes, found in O(log n) however long the
+# history is. That check runs before every ORM write of a show and works on
+# any database; on postgres an exclusion constraint over
+# tsrange(startTime, endTime) per venue and per artist also holds under
+# concurrent writes.
+
+
+class BookingError(ValueError):
+
+    def __init__(self, message, conflicts=()):
+        ValueError.__init__(self, message)
+        self.conflicts = list(conflicts)
+
+
+def check_length(start, end, max_length):
+    if not start < end <= start + max_length:
+        raise BookingError('a show must end after it starts and last at most %s' % max_length)
+
+
+def overlaps(start_column, end_column, start, end, max_length):
+    # [start_column, end_column) intersects [start, end)
+    return and_(start_column > start - max_length, start_column < end, end_column > start)
+
+
+class Bookings(object):
+    # the overlap query over rows held in memory, for checking a batch of shows
+    # against each other and against the shows loaded around them
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self._booked = {}
+
+    def add(self, owner, start, end):
+        insort(self._booked.setdefault(owner, []), (start, end))
+
+    def conflicts(self, owner, start, end):
+        booked = self._booked.get(owner, [])
+        low = bisect_right(booked, (start - self.max_length,))
+        high = bisect_left(booked, (end,))
+        return [item for item in booked[low:high] if item[1] > start]
+
+
+def merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def gaps(busy, start, end, length):
+    # the free stretches of [start, end) at least `length` long around `busy`
+    free = []
+    for busy_start, busy_end in merge(busy):
+        if busy_start - start >= length:
+            free.append((start, min(busy_start, end)))
+        start = max(start, busy_end)
+        if start >= end:
+            break
+    if end - start >= length:
+        free.append((start, end))
+    return free
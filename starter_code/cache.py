@@ -0,0 +1,238 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from datetime import datetime
+
+from flask import g, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+# Response cache for read-mostly pages.
+#
+# Every cached page carries a set of tags ("venue:7", "shows", ...) naming the
+# rows it was rendered from. Invalidating a tag bumps its version; an entry is
+# only served while all of its tags still have the versions it was stored
+# with, so eviction is exact without keeping a tag -> keys index. Versions come
+# from one increasing sequence, which also lets a response rendered while a
+# write committed be recognised as stale and not stored.
+
+
+class LRUCache(object):
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MemoryBackend(object):
+    # per-process; tag versions are kept outside the LRU so they are never evicted
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.entries = LRUCache(maxsize, ttl)
+        self._versions = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def sequence(self):
+        return self._sequence
+
+    def versions(self, tags):
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                self._versions[tag] = self._sequence
+
+    def clear(self):
+        self.entries.clear()
+        self.bump(list(self._versions))
+
+
+class RedisBackend(object):
+    # shared between workers; `client` is anything with the redis-py get/set/
+    # mget/mset/incr/delete/scan_iter methods, so a local stand-in can take
+    # its place
+
+    def __init__(self, client, ttl=300, prefix='fyyur:cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def sequence(self):
+        return int(self.client.get(self.prefix + 'sequence') or 0)
+
+    def versions(self, tags):
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def bump(self, tags):
+        sequence = self.client.incr(self.prefix + 'sequence')
+        if tags:
+            self.client.mset({self.prefix + 'tag:' + tag: sequence for tag in tags})
+
+    def clear(self):
+        # drops the entries and moves every tag past the current sequence, so a
+        # response rendered before the clear is not stored afterwards
+        sequence = self.client.incr(self.prefix + 'sequence')
+        tags, entries = [], []
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            name = key.decode('utf-8') if isinstance(key, bytes) else key
+            if name.startswith(self.prefix + 'tag:'):
+                tags.append(key)
+            elif name != self.prefix + 'sequence':
+                entries.append(key)
+        if tags:
+            self.client.mset({key: sequence for key in tags})
+        if entries:
+            self.client.delete(*entries)
+
+
+class ResponseCache(object):
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_SIZE', 1024)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        app.config.setdefault('RESPONSE_CACHE_URL', None)
+        if self.backend is None:
+            url = app.config['RESPONSE_CACHE_URL']
+            if url:
+                import redis
+                self.backend = RedisBackend(redis.Redis.from_url(url), app.config['RESPONSE_CACHE_TTL'])
+            else:
+                self.backend = MemoryBackend(app.config['RESPONSE_CACHE_SIZE'], app.config['RESPONSE_CACHE_TTL'])
+        self.enabled = app.config['RESPONSE_CACHE_ENABLED']
+        app.extensions['response_cache'] = self
+
+    def tag(self, *tags):
+        # called by a view while it builds the page
+        if 'cache_tags' in g:
+            g.cache_tags.update(tags)
+
+    def invalidate(self, tags):
+        if tags:
+            self.backend.bump(set(tags))
+
+    def clear(self):
+        self.backend.clear()
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages carrying flashed messages are per-user and never cached
+            if not self.enabled or request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            key = 'view:' + request.full_path
+            if 'version_stamp' in g:
+                # set by conditional(): the stamp can move with nothing flushed
+                # (a show starting, a recount), and that has to be a miss too
+                key += '@' + g.version_stamp
+            entry = self.backend.get(key)
+            if entry is not None:
+                body, content_type, versions = entry
+                if self.backend.versions(versions) == versions:
+                    return make_response(body, {'Content-Type': content_type})
+            started = self.backend.sequence()
+            g.cache_tags = set()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                versions = self.backend.versions(g.cache_tags)
+                if all(version <= started for version in versions.values()):
+                    self.backend.set(key, (response.get_data(), response.content_type, versions))
+            return response
+        return wrapper
+
+
+def conditional(stamp):
+    # ETag/Last-Modified for a read view; `stamp(**view_args)` returns a row of
+    # cheap version values and is evaluated before the view runs, so a client
+    # holding the current version gets a 304 without any rendering; a cached
+    # view below it is keyed by the same version. Only a
+    # stamp made of timestamps gets a Last-Modified: its other parts (counts)
+    # change on deletes that leave the newest timestamp as it was, which
+    # If-Modified-Since cannot see, so those views validate on the ETag alone.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(*args, **kwargs)
+            values = tuple(stamp(*args, **kwargs))
+            etag = hashlib.sha1(repr((request.full_path,) + values).encode('utf-8')).hexdigest()
+            g.version_stamp = etag
+            modified = [value for value in values if value is not None]
+            last_modified = None
+            if modified and all(isinstance(value, datetime) for value in modified):
+                last_modified = max(modified).replace(microsecond=0)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
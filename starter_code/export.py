@@ -0,0 +1,65 @@
+import csv
+import json
+import zlib
+from datetime import datetime
+
+# Encoders for the /export endpoints.
+#
+# Rows come from a server-side cursor and are turned into CSV or NDJSON lines
+# one at a time; lines are joined into chunks of about CHUNK_SIZE bytes (so the
+# server is not asked to write every row separately) and optionally gzipped on
+# the fly. Nothing holds more than one chunk, whatever the size of the table.
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo(object):
+    # lets csv.writer hand back the formatted line instead of writing it
+
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def ndjson_lines(names, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(_value, row))), separators=(',', ':')) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
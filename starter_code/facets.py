@@ -0,0 +1,105 @@
+from collections import namedtuple
+
+from flask import request, url_for
+from sqlalchemy import case, func, literal, text
+
+# Faceted browsing for the listing pages.
+#
+# A facet is a string-valued SQL expression over the listed model (a column, or
+# a flag() rendered as '1'/'0'). The selection comes from the query string: one
+# value per facet, except `multiple` facets whose values repeat and must all
+# match. Counts for every facet come from a single UNION ALL of grouped
+# SELECTs; each branch is filtered by the selection minus its own facet, so a
+# count is the number of rows left after picking that value instead of the
+# current one. Multiple facets keep their own selection (picking another value
+# narrows further).
+
+Value = namedtuple('Value', 'value label count selected url')
+Group = namedtuple('Group', 'name label values')
+Browse = namedtuple('Browse', 'criteria groups selected clear_url')
+
+
+class Facet(object):
+
+    def __init__(self, name, label, key, multiple=False, join=None, filter=None, labels=None):
+        # join(query) adds what `key` needs beyond the model; filter(values)
+        # yields the criteria for a selection (default: key == value)
+        self.name = name
+        self.label = label
+        self.key = key
+        self.multiple = multiple
+        self.join = join
+        self.filter = filter
+        self.labels = labels or {}
+
+    def selection(self, args):
+        values = [value for value in args.getlist(self.name) if value]
+        if self.labels:
+            values = [value for value in values if value in self.labels]
+        return values if self.multiple else values[:1]
+
+    def criteria(self, values):
+        if not values:
+            return []
+        if self.filter is not None:
+            return list(self.filter(values))
+        return [self.key == values[0]]
+
+
+def flag(condition):
+    return case((condition, '1'), else_='0')
+
+
+def facet_url(name, value, selected, multiple):
+    # the current URL with `value` toggled; paging restarts
+    args = request.args.to_dict(flat=False)
+    args.pop('cursor', None)
+    values = args.get(name, [])
+    if selected:
+        values = [other for other in values if other != value]
+    else:
+        values = (values if multiple else []) + [value]
+    args[name] = values
+    return url_for(request.endpoint, **dict(request.view_args, **args))
+
+
+def count_query(session, model, facets, selection):
+    branches = []
+    for facet in facets:
+        query = session.query(literal(facet.name).label('facet'), facet.key.label('value'),
+                              func.count().label('count')).select_from(model)
+        if facet.join is not None:
+            query = facet.join(query)
+        for other in facets:
+            if other is not facet or facet.multiple:
+                query = query.filter(*other.criteria(selection[other.name]))
+        # by position: postgres does not match a key holding bound parameters
+        # (the flags) against its copy in the select list
+        branches.append(query.group_by(text('2')))
+    return branches[0].union_all(*branches[1:])
+
+
+def browse(session, model, facets, limit):
+    # the selected criteria for the listing query plus the counted facet values
+    selection = {facet.name: facet.selection(request.args) for facet in facets}
+    counts = {}
+    for name, value, count in count_query(session, model, facets, selection):
+        if value is not None and value != '':
+            counts.setdefault(name, []).append((value, count))
+    groups = []
+    for facet in facets:
+        selected = selection[facet.name]
+        values = sorted(counts.get(facet.name, ()), key=lambda item: (-item[1], item[0]))
+        shown = [item for item in values if item[0] in selected]
+        shown += [item for item in values if item[0] not in selected][:max(0, limit - len(shown))]
+        groups.append(Group(facet.name, facet.label, [
+            Value(value, facet.labels.get(value, value), count, value in selected,
+                  facet_url(facet.name, value, value in selected, facet.multiple))
+            for value, count in shown if not facet.labels or value in facet.labels]))
+    criteria = [criterion for facet in facets for criterion in facet.criteria(selection[facet.name])]
+    clear_url = None
+    if any(selection.values()):
+        args = {name: value for name, value in request.args.to_dict(flat=False).items()
+                if name not in selection and name != 'cursor'}
+        clear_url = url_for(request.endpoint, **dict(request.view_args, **args))
+    return Browse(criteria, groups, any(selection.values()), clear_url)
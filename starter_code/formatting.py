@@ -0,0 +1,39 @@
+from datetime import timezone
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+# Date formatting for the `datetime` Jinja filter.
+#
+# Templates pass native datetimes, so nothing is re-parsed; the compiled Babel
+# pattern is looked up once per (format, locale) and finished strings are kept
+# in a bounded LRU, since a listing page repeats the same start times a lot.
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled_pattern(format, locale):
+    return babel.dates.parse_pattern(FORMATS[format]), Locale.parse(locale)
+
+
+@lru_cache(maxsize=8192)
+def _format_datetime(value, format, locale):
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    if format not in FORMATS:
+        return babel.dates.format_datetime(value, format, locale=locale)
+    pattern, locale = compiled_pattern(format, locale)
+    if value.tzinfo is None:
+        # babel treats naive datetimes as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale=None):
+    return _format_datetime(value, format, locale or babel.dates.LC_TIME)
@@ -2,7 +2,8 @@ from datetime import datetime
 from flask_wtf import Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
 from wtforms.fields.html5 import URLField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, URL, Optional
+from genres import registry as genre_registry
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -16,8 +17,18 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()]
+    )
+
+class GenreChoices(object):
+    # the registry learns genres added at runtime, so refresh per form
+    def __init__(self, *args, **kwargs):
+        super(GenreChoices, self).__init__(*args, **kwargs)
+        self.genres.choices = genre_registry.choices()
 
-class VenueForm(Form):
+class VenueForm(GenreChoices, Form):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -90,29 +101,8 @@ class VenueForm(Form):
         'image_link'
     )
     genres = SelectMultipleField(
-        # TODO implement enum restriction
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=genre_registry.choices()
     )
     facebook_link = StringField(
         'facebook_link', validators=[URL()]
@@ -121,7 +111,7 @@ class VenueForm(Form):
     seeking_talent = BooleanField('seeking_venue ', validators=[URL()])
     seeking_desc = StringField('seeking_description', validators=[URL()])
 
-class ArtistForm(Form):
+class ArtistForm(GenreChoices, Form):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -192,29 +182,8 @@ class ArtistForm(Form):
             'image_link', validators=[URL()]
     )
     genres = SelectMultipleField(
-        # TODO implement enum restriction
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=genre_registry.choices()
     )
     facebook_link = URLField(
         # TODO implement enum restriction
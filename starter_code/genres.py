@@ -0,0 +1,83 @@
+import threading
+
+from sqlalchemy import select
+
+# Genre names and ids.
+#
+# Venue.genres / Artist.genres keep the comma-separated names for display; the
+# Genre table and the venue_genres / artist_genres link tables hold the same
+# data normalized and indexed for filtering. The registry caches the
+# name -> id mapping for the process, so writes resolve names without a query
+# per genre and the forms get their choices without touching the database.
+
+DEFAULT_GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+    'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+    'Rock n Roll', 'Soul', 'Other',
+]
+
+
+def split(value):
+    # names from a form list, "Jazz,Blues" or a postgres array literal "{Jazz,"R&B"}"
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.strip().lstrip('{').rstrip('}').split(',')
+    names = (name.strip().strip('"').strip() for name in value)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def join(value):
+    return ','.join(split(value)) or None
+
+
+class GenreRegistry(object):
+
+    def __init__(self, table=None, connect=None, defaults=DEFAULT_GENRES):
+        # connect() returns a connection (context manager) for reads outside a flush
+        self.table = table
+        self.connect = connect
+        self.defaults = defaults
+        self.loaded = False
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def load(self, connection):
+        rows = connection.execute(select(self.table.c.id, self.table.c.name))
+        with self._lock:
+            self._ids = {name: id for id, name in rows}
+            self.loaded = True
+
+    def reset(self):
+        # after a rollback the cache may hold ids of genres that were never committed
+        with self._lock:
+            self._ids = {}
+            self.loaded = False
+
+    def ids(self, connection, names):
+        # ids for `names`, creating the genres that do not exist yet
+        if not self.loaded:
+            self.load(connection)
+        missing = [name for name in names if name not in self._ids]
+        if missing:
+            # another process may have created them since we loaded
+            found = dict((name, id) for id, name in connection.execute(
+                select(self.table.c.id, self.table.c.name).where(self.table.c.name.in_(missing))))
+            for name in missing:
+                if name not in found:
+                    found[name] = connection.execute(self.table.insert().values(name=name)).inserted_primary_key[0]
+            with self._lock:
+                self._ids.update(found)
+        return [self._ids[name] for name in names]
+
+    def names(self):
+        if not self.loaded and self.connect is not None:
+            with self.connect() as connection:
+                self.load(connection)
+        return sorted(set(self.defaults) | set(self._ids))
+
+    def choices(self):
+        return [(name, name) for name in self.names()]
+
+
+registry = GenreRegistry()
@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+
+import booking
+import phones
+from app import db, Venue, Artist, Show, COUNTED_BY, recount_shows, relink_genres
+from app import booked_between, max_show_length, show_length, show_time
+from forms import VenueForm, ArtistForm, ShowForm
+
+# Bulk import behind `flask import`.
+#
+# Input (CSV with a header row, or NDJSON) is read in chunks. Every row goes
+# through the same form as the web handlers, foreign keys are resolved with one
+# lookup per chunk, and valid rows are written with bulk_insert_mappings and
+# committed per chunk. After each commit the number of consumed input rows is
+# saved to a checkpoint file, so an interrupted run can continue with --resume.
+# Rejected rows are written to an NDJSON file together with their errors.
+
+KINDS = {
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'shows': (Show, ShowForm),
+}
+
+# input column -> form field, where the two differ
+FORM_FIELDS = {'seeking_description': 'seeking_desc', 'startTime': 'start_time', 'endTime': 'end_time'}
+# form field -> model column, where the two differ
+MODEL_COLUMNS = {'seeking_desc': 'seeking_description', 'start_time': 'startTime', 'end_time': 'endTime'}
+# DateTimeFields, and the one format the form parses
+TIME_FIELDS = {'start_time', 'end_time'}
+FORM_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# the forms put URL() on these, which the web handlers never enforce (on a
+# checked BooleanField it raises TypeError instead of failing)
+UNCHECKED_FIELDS = {'seeking_talent', 'seeking_venue', 'seeking_desc'}
+
+
+class Rejected(Exception):
+
+    def __init__(self, errors):
+        Exception.__init__(self, errors)
+        self.errors = errors
+
+
+def read_rows(path):
+    with io.open(path, newline='', encoding='utf-8') as source:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(source):
+                yield row
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def form_time(value):
+    # exports write ISO 8601 ('2027-01-02T20:00:00'); anything that is not ISO
+    # is left for the form to reject
+    try:
+        return show_time(value).strftime(FORM_TIME_FORMAT)
+    except ValueError:
+        return value
+
+
+def form_data(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None or value == '':
+            continue
+        field = FORM_FIELDS.get(key, key)
+        if field == 'genres' and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(',') if genre.strip()]
+        if field in TIME_FIELDS and isinstance(value, str):
+            value = form_time(value)
+        if isinstance(value, bool):
+            value = 'y' if value else ''
+        for item in (value if isinstance(value, list) else [value]):
+            data.add(field, str(item))
+    return data
+
+
+def validate(form_class, row):
+    form = form_class(formdata=form_data(row), meta={'csrf': False})
+    for name in UNCHECKED_FIELDS & set(form._fields):
+        form[name].validators = ()
+    try:
+        valid = form.validate()
+    except Exception as e:
+        raise Rejected({'form': [repr(e)]})
+    if not valid:
+        # like the web handlers, accept blank optional fields
+        errors = {name: messages for name, messages in form.errors.items()
+                  if form[name].data or form[name].flags.required}
+        if errors:
+            raise Rejected(errors)
+    if form._fields.get('phone') is not None and form.phone.data and not phones.is_valid(form.phone.data):
+        raise Rejected({'phone': ['Invalid phone number.']})
+    mapping = {}
+    for name, field in form._fields.items():
+        value = field.data
+        if isinstance(value, list):
+            value = ','.join(value)
+        if value == '':
+            # a blank StringField is '' on WTForms 2 (None on 3); store NULL
+            value = None
+        mapping[MODEL_COLUMNS.get(name, name)] = value
+    return mapping
+
+
+def resolve_ids(model, ids, names):
+    # id -> id for ids that exist, name -> id for names that are unique
+    found = {}
+    if ids:
+        found.update((id, id) for id, in db.session.query(model.id).filter(model.id.in_(ids)))
+    if names:
+        matches = {}
+        for id, name in db.session.query(model.id, model.name).filter(model.name.in_(names)):
+            matches.setdefault(name, []).append(id)
+        found.update((name, ids[0]) for name, ids in matches.items() if len(ids) == 1)
+    return found
+
+
+def resolve_show_keys(rows):
+    # (venue_id, artist_id) per row, from either *_id or *_name columns; None
+    # where the venue or artist does not exist (or the name is ambiguous)
+    keys = {}
+    for model, prefix in ((Venue, 'venue'), (Artist, 'artist')):
+        keys[prefix] = [int(row[prefix + '_id']) if str(row.get(prefix + '_id') or '').isdigit()
+                        else row.get(prefix + '_name') for row in rows]
+        ids = {key for key in keys[prefix] if isinstance(key, int)}
+        names = {key for key in keys[prefix] if key and not isinstance(key, int)}
+        found = resolve_ids(model, ids, names)
+        keys[prefix] = [found.get(key) for key in keys[prefix]]
+    return list(zip(keys['venue'], keys['artist']))
+
+
+def check_bookings(mappings, sources):
+    # bulk inserts skip the booking hook: the chunk is checked against the shows
+    # booked around it (one query) and against itself
+    length, max_length = show_length(), max_show_length()
+    for mapping in mappings:
+        mapping['endTime'] = mapping.get('endTime') or mapping['startTime'] + length
+    if not mappings:
+        return [], []
+    start = min(mapping['startTime'] for mapping in mappings)
+    end = max(mapping['endTime'] for mapping in mappings)
+    bookings = booking.Bookings(max_length)
+    busy = db.session.query(Show.venue_id, Show.artist_id, Show.startTime, Show.endTime)
+    rows = busy.filter(Show.venue_id.in_({mapping['venue_id'] for mapping in mappings}),
+                       booked_between(start, end)).union_all(
+        busy.filter(Show.artist_id.in_({mapping['artist_id'] for mapping in mappings}),
+                    booked_between(start, end)))
+    for venue_id, artist_id, show_start, show_end in rows:
+        bookings.add(('venue', venue_id), show_start, show_end)
+        bookings.add(('artist', artist_id), show_start, show_end)
+    accepted, rejects = [], []
+    for mapping, (line, row) in zip(mappings, sources):
+        owners = (('venue', mapping['venue_id']), ('artist', mapping['artist_id']))
+        try:
+            booking.check_length(mapping['startTime'], mapping['endTime'], max_length)
+            if any(bookings.conflicts(owner, mapping['startTime'], mapping['endTime']) for owner in owners):
+                raise booking.BookingError('the venue or the artist is already booked then')
+        except booking.BookingError as e:
+            rejects.append({'line': line, 'row': row, 'errors': {'startTime': [str(e)]}})
+            continue
+        for owner in owners:
+            bookings.add(owner, mapping['startTime'], mapping['endTime'])
+        accepted.append(mapping)
+    return accepted, rejects
+
+
+def import_chunk(kind, rows):
+    model, form_class = KINDS[kind]
+    if kind == 'shows':
+        keys = resolve_show_keys([row for _, row in rows])
+    mappings, sources, rejects = [], [], []
+    for position, (line, row) in enumerate(rows):
+        try:
+            mapping = validate(form_class, row)
+            if kind == 'shows':
+                venue_id, artist_id = keys[position]
+                if venue_id is None or artist_id is None:
+                    raise Rejected({'venue_id' if venue_id is None else 'artist_id': ['not found']})
+                mapping['venue_id'], mapping['artist_id'] = venue_id, artist_id
+        except Rejected as e:
+            rejects.append({'line': line, 'row': row, 'errors': e.errors})
+            continue
+        mappings.append(mapping)
+        sources.append((line, row))
+
+    if kind == 'shows':
+        mappings, conflicts = check_bookings(mappings, sources)
+        rejects.extend(conflicts)
+    else:
+        # bulk inserts skip @validates, so normalize the whole chunk at once
+        for mapping, e164 in zip(mappings, phones.normalize_many([m.get('phone') for m in mappings])):
+            mapping['phone_e164'] = e164
+    db.session.bulk_insert_mappings(model, mappings, return_defaults=kind != 'shows')
+    if kind != 'shows' and mappings:
+        # nor are the genre links written
+        relink_genres(model, [mapping['id'] for mapping in mappings])
+    if kind == 'shows' and mappings:
+        # bulk inserts also skip the counter hooks
+        now = datetime.now()
+        for counted, show_fk in COUNTED_BY:
+            ids = {mapping[show_fk.key] for mapping in mappings}
+            recount_shows(counted, show_fk, now, ids)
+    db.session.commit()
+    return len(mappings), rejects
+
+
+def run(kind, path, chunk_size=1000, rejects_path=None, resume=False):
+    checkpoint_path = path + '.checkpoint'
+    rejects_path = rejects_path or path + '.rejects.ndjson'
+    done = 0
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as checkpoint:
+            done = json.load(checkpoint)['rows']
+    rows = islice(enumerate(read_rows(path), start=1), done, None)
+    inserted = rejected = 0
+    started = time.time()
+    with io.open(rejects_path, 'a' if resume else 'w', encoding='utf-8') as rejects_file:
+        while True:
+            chunk = [(line, row) for line, row in islice(rows, chunk_size)]
+            if not chunk:
+                break
+            count, rejects = import_chunk(kind, chunk)
+            for reject in rejects:
+                rejects_file.write(json.dumps(reject, default=str) + '\n')
+            rejects_file.flush()
+            done += len(chunk)
+            inserted += count
+            rejected += len(rejects)
+            with open(checkpoint_path, 'w') as checkpoint:
+                json.dump({'rows': done}, checkpoint)
+            elapsed = time.time() - started
+            print('%s: %d rows read, %d inserted, %d rejected (%.0f rows/s)' % (
+                kind, done, inserted, rejected, (inserted + rejected) / elapsed if elapsed else 0))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    if os.path.getsize(rejects_path) == 0:
+        # nothing rejected by this run, nor by the run it resumed
+        os.remove(rejects_path)
+    return inserted, rejected
@@ -0,0 +1,47 @@
+from flask import g
+
+# Batched, request-scoped lookups by key.
+#
+# Code that is about to need several objects primes their keys first; the next
+# load() then fetches everything still missing with a single batch call (one
+# IN (...) query) and remembers the results, including misses, until the end
+# of the request. Repeated loads of the same key never reach the database.
+
+
+class DataLoader(object):
+
+    def __init__(self, batch):
+        # batch(keys) -> {key: value}; keys missing from the result load as None
+        self.batch = batch
+        self._cache = {}
+        self._pending = set()
+
+    def prime(self, keys):
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        if self._pending:
+            pending, self._pending = self._pending, set()
+            found = self.batch(pending)
+            for key in pending:
+                self._cache[key] = found.get(key)
+        return [self._cache[key] for key in keys]
+
+    def load(self, key):
+        return self.load_many([key])[0]
+
+
+def request_loader(name, batch):
+    # the loader called `name` for the current request, created on first use
+    loaders = g.setdefault('loaders', {})
+    if name not in loaders:
+        loaders[name] = DataLoader(batch)
+    return loaders[name]
+
+
+def reset_loaders(error=None):
+    # registered as a teardown_request handler; g outlives the request when
+    # an application context was already pushed (CLI commands, tests)
+    g.pop('loaders', None)
@@ -0,0 +1,197 @@
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from flask import before_render_template, request_started, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request instrumentation.
+#
+# SQL statements are counted and timed with the cursor execute events, template
+# rendering with Flask's template signals, and the request itself from
+# request_started to teardown. The totals go out as a Server-Timing header and
+# are aggregated into per-endpoint histograms served in the Prometheus text
+# format at /metrics. Requests issuing more statements than their budget are
+# logged as warnings. Metrics are per process.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = ['%s="%s"' % (name, _escape(value)) for name, value in zip(names, values)]
+    return '{' + ','.join(pairs + ([extra] if extra else [])) + '}'
+
+
+class Histogram(object):
+
+    def __init__(self, name, help, buckets, labels=('endpoint', 'method')):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values, amount):
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    counts[i] += 1
+            series[1] += amount
+            series[2] += 1
+
+    def expose(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            series = sorted((values, list(counts), total, count)
+                            for values, (counts, total, count) in self._series.items())
+        for values, counts, total, count in series:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels, values, 'le="%s"' % bound),
+                                                 bucket_count))
+            lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels, values, 'le="+Inf"'), count))
+            lines.append('%s_sum%s %r' % (self.name, _labels(self.labels, values), total))
+            lines.append('%s_count%s %d' % (self.name, _labels(self.labels, values), count))
+        return lines
+
+
+class Counter(object):
+
+    def __init__(self, name, help, labels=('endpoint', 'method')):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def expose(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s counter' % self.name]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend('%s%s %d' % (self.name, _labels(self.labels, key), value) for key, value in values)
+        return lines
+
+
+class RequestTimings(object):
+    __slots__ = ('started', 'statements', 'db_time', 'template_time', 'template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_started = []
+
+
+def _timings():
+    if has_request_context():
+        return g.get('request_timings')
+    return None
+
+
+class Instrumentation(object):
+
+    def __init__(self, app=None):
+        self.requests = Histogram('fyyur_request_duration_seconds', 'Wall time per request.', DURATION_BUCKETS)
+        self.db_time = Histogram('fyyur_request_db_seconds', 'Time spent in SQL per request.', DURATION_BUCKETS)
+        self.template_time = Histogram('fyyur_request_template_seconds', 'Template rendering time per request.',
+                                       DURATION_BUCKETS)
+        self.statements = Histogram('fyyur_request_queries', 'SQL statements per request.', QUERY_BUCKETS)
+        self.over_budget = Counter('fyyur_query_budget_exceeded_total',
+                                   'Requests that issued more SQL statements than their budget.')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_BUDGET', 20)
+        app.config.setdefault('QUERY_BUDGETS', {})
+        app.config.setdefault('SERVER_TIMING', True)
+        app.config.setdefault('METRICS_URL', '/metrics')
+        # engine events are registered on the Engine class so they also cover
+        # engines created after this point
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        request_started.connect(self._request_started, app)
+        before_render_template.connect(self._before_render_template, app)
+        template_rendered.connect(self._template_rendered, app)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config['METRICS_URL']:
+            app.add_url_rule(app.config['METRICS_URL'], 'metrics', self.metrics)
+        app.extensions['instrumentation'] = self
+
+    def _request_started(self, sender, **extra):
+        g.request_timings = RequestTimings()
+
+    def _before_render_template(self, sender, **extra):
+        timings = _timings()
+        if timings is not None:
+            timings.template_started.append(time.perf_counter())
+
+    def _template_rendered(self, sender, **extra):
+        timings = _timings()
+        if timings is not None and timings.template_started:
+            timings.template_time += time.perf_counter() - timings.template_started.pop()
+
+    def _after_request(self, response):
+        # streamed bodies are still running here; the histograms are fed at
+        # teardown, after the last chunk
+        timings = _timings()
+        if timings is not None and current_app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = ', '.join([
+                'db;dur=%.1f;desc="%d queries"' % (timings.db_time * 1000, timings.statements),
+                'tpl;dur=%.1f' % (timings.template_time * 1000),
+                'app;dur=%.1f' % ((time.perf_counter() - timings.started) * 1000),
+            ])
+        return response
+
+    def _teardown_request(self, error=None):
+        timings = g.pop('request_timings', None)
+        if timings is None:
+            return
+        # unmatched URLs share one label so scanners cannot blow up the series
+        endpoint = request.endpoint or 'unmatched'
+        labels = (endpoint, request.method)
+        self.requests.observe(labels, time.perf_counter() - timings.started)
+        self.db_time.observe(labels, timings.db_time)
+        self.template_time.observe(labels, timings.template_time)
+        self.statements.observe(labels, timings.statements)
+        budget = current_app.config['QUERY_BUDGETS'].get(endpoint, current_app.config['QUERY_BUDGET'])
+        if timings.statements > budget:
+            self.over_budget.inc(labels)
+            current_app.logger.warning('%s %s issued %d SQL statements (budget %d)',
+                                       request.method, request.full_path, timings.statements, budget)
+
+    def metrics(self):
+        lines = []
+        for metric in (self.requests, self.db_time, self.template_time, self.statements, self.over_budget):
+            lines.extend(metric.expose())
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _timings() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _timings()
+    started = conn.info.get('query_started')
+    if timings is not None and started:
+        timings.statements += 1
+        timings.db_time += time.perf_counter() - started.pop()
@@ -0,0 +1,69 @@
+"""Genre lookup table with venue/artist link tables
+
+Revision ID: 2c8e4f71a9d3
+Revises: f19c6a2d7b40
+Create Date: 2026-10-18 18:12:40.551208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8e4f71a9d3'
+down_revision = 'f19c6a2d7b40'
+branch_labels = None
+depends_on = None
+
+
+def split(value):
+    # "Jazz,Blues" or a postgres array literal such as {Jazz,"R&B"}
+    if not value:
+        return []
+    names = (name.strip().strip('"').strip() for name in value.strip().lstrip('{').rstrip('}').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade():
+    genre = op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    links = {}
+    for table_name, fk in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        link_table = table_name.lower() + '_genres'
+        links[table_name] = op.create_table(link_table,
+        sa.Column(fk, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([fk], [table_name + '.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+        sa.PrimaryKeyConstraint(fk, 'genre_id')
+        )
+        op.create_index('ix_%s_genre_id' % link_table, link_table, ['genre_id', fk], unique=False)
+
+    # backfill from the genres strings; the column itself stays as the display value
+    connection = op.get_bind()
+    rows = {}
+    for table_name in links:
+        table = sa.table(table_name, sa.column('id'), sa.column('genres'))
+        rows[table_name] = [(id, split(value)) for id, value in connection.execute(
+            sa.select(table.c.id, table.c.genres).where(table.c.genres.isnot(None)))]
+    names = sorted(set(name for table_rows in rows.values() for _, row_names in table_rows for name in row_names))
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    ids = dict((name, id) for id, name in connection.execute(sa.select(genre.c.id, genre.c.name)))
+    for table_name, link_table in links.items():
+        fk = link_table.c.keys()[0]
+        values = [{fk: id, 'genre_id': ids[name]} for id, row_names in rows[table_name] for name in row_names]
+        if values:
+            op.bulk_insert(link_table, values)
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres_genre_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('Genre')
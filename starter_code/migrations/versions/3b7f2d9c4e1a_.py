@@ -0,0 +1,65 @@
+"""full-text search index on Venue and Artist
+
+Revision ID: 3b7f2d9c4e1a
+Revises: 9217f78e17c8
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7f2d9c4e1a'
+down_revision = '9217f78e17c8'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            # name ranks above location, location above genres
+            op.execute(
+                'ALTER TABLE "{table}" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ('
+                "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(genres, '')), 'C')"
+                ') STORED'.format(table=table))
+            op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'],
+                            postgresql_using='gin')
+        elif dialect == 'sqlite':
+            fts = table + '_fts'
+            columns = ', '.join(COLUMNS)
+            new = ', '.join('new.' + column for column in COLUMNS)
+            old = ', '.join('old.' + column for column in COLUMNS)
+            op.execute('CREATE VIRTUAL TABLE "{fts}" USING fts5({columns}, content=\'{table}\', '
+                       'content_rowid=\'id\')'.format(fts=fts, columns=columns, table=table))
+            op.execute('CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+                       'INSERT INTO "{fts}"(rowid, {columns}) VALUES (new.id, {new}); END'.format(
+                           fts=fts, table=table, columns=columns, new=new))
+            op.execute('CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+                       'INSERT INTO "{fts}"("{fts}", rowid, {columns}) VALUES (\'delete\', old.id, {old}); '
+                       'END'.format(fts=fts, table=table, columns=columns, old=old))
+            op.execute('CREATE TRIGGER "{fts}_au" AFTER UPDATE OF {columns} ON "{table}" BEGIN '
+                       'INSERT INTO "{fts}"("{fts}", rowid, {columns}) VALUES (\'delete\', old.id, {old}); '
+                       'INSERT INTO "{fts}"(rowid, {columns}) VALUES (new.id, {new}); END'.format(
+                           fts=fts, table=table, columns=columns, old=old, new=new))
+            op.execute('INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')'.format(fts=fts))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+            op.drop_column(table, 'search_vector')
+        elif dialect == 'sqlite':
+            fts = table + '_fts'
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER IF EXISTS "{}_{}"'.format(fts, trigger))
+            op.execute('DROP TABLE IF EXISTS "{}"'.format(fts))
@@ -0,0 +1,24 @@
+"""state/city index on Artist for the browse facets
+
+Revision ID: 7d3a9e5b1c24
+Revises: 2c8e4f71a9d3
+Create Date: 2026-10-18 21:12:37.441906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a9e5b1c24'
+down_revision = '2c8e4f71a9d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Artist_state_city_name', 'Artist', ['state', 'city', 'name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_state_city_name', table_name='Artist')
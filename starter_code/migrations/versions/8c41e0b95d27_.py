@@ -0,0 +1,32 @@
+"""indexes for show lookups and listing order
+
+Revision ID: 8c41e0b95d27
+Revises: 3b7f2d9c4e1a
+Create Date: 2026-10-18 11:04:52.918364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e0b95d27'
+down_revision = '3b7f2d9c4e1a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_startTime', 'Show', ['venue_id', 'startTime'], unique=False)
+    op.create_index('ix_Show_artist_id_startTime', 'Show', ['artist_id', 'startTime'], unique=False)
+    op.create_index('ix_Show_startTime', 'Show', ['startTime', 'id'], unique=False)
+    op.create_index('ix_Venue_state_city_name', 'Venue', ['state', 'city', 'name', 'id'], unique=False)
+    op.create_index('ix_Artist_name', 'Artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name', table_name='Artist')
+    op.drop_index('ix_Venue_state_city_name', table_name='Venue')
+    op.drop_index('ix_Show_startTime', table_name='Show')
+    op.drop_index('ix_Show_artist_id_startTime', table_name='Show')
+    op.drop_index('ix_Show_venue_id_startTime', table_name='Show')
@@ -0,0 +1,58 @@
+"""show end times and no overlapping bookings per venue or artist
+
+Revision ID: a4f0c8d2e6b1
+Revises: 7d3a9e5b1c24
+Create Date: 2026-10-18 22:03:51.270344
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f0c8d2e6b1'
+down_revision = '7d3a9e5b1c24'
+branch_labels = None
+depends_on = None
+
+# SHOW_LENGTH_MINUTES when this was written
+SHOW_LENGTH = timedelta(minutes=120)
+BATCH_SIZE = 10000
+
+
+def upgrade():
+    connection = op.get_bind()
+    op.add_column('Show', sa.Column('endTime', sa.DateTime(), nullable=True))
+    if connection.dialect.name == 'postgresql':
+        op.execute('UPDATE "Show" SET "endTime" = "startTime" + interval \'%d minutes\''
+                   % (SHOW_LENGTH.total_seconds() // 60))
+    else:
+        show = sa.table('Show', sa.column('id', sa.Integer), sa.column('startTime', sa.DateTime),
+                        sa.column('endTime', sa.DateTime))
+        update = show.update().where(show.c.id == sa.bindparam('show_id')) \
+            .values(endTime=sa.bindparam('end_time'))
+        rows = connection.execute(sa.select(show.c.id, show.c.startTime)).fetchall()
+        for offset in range(0, len(rows), BATCH_SIZE):
+            connection.execute(update, [{'show_id': id, 'end_time': start + SHOW_LENGTH}
+                                        for id, start in rows[offset:offset + BATCH_SIZE]])
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.alter_column('endTime', existing_type=sa.DateTime(), nullable=False)
+    if connection.dialect.name == 'postgresql':
+        # fails if the existing data already has double bookings; those have
+        # to be resolved first
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for owner in ('venue_id', 'artist_id'):
+            op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_%s_booking" '
+                       'EXCLUDE USING gist ("%s" WITH =, tsrange("startTime", "endTime") WITH &&)'
+                       % (owner, owner))
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql':
+        for owner in ('artist_id', 'venue_id'):
+            op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_%s_booking"' % owner)
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('endTime')
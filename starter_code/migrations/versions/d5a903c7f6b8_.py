@@ -0,0 +1,35 @@
+"""denormalized upcoming/past show counters on Venue and Artist
+
+Revision ID: d5a903c7f6b8
+Revises: 8c41e0b95d27
+Create Date: 2026-10-18 13:27:09.551203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a903c7f6b8'
+down_revision = '8c41e0b95d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, foreign_key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.execute(
+            'UPDATE "{table}" SET '
+            'upcoming_shows_count = (SELECT count(*) FROM "Show" '
+            'WHERE "Show".{fk} = "{table}".id AND "Show"."startTime" > CURRENT_TIMESTAMP), '
+            'past_shows_count = (SELECT count(*) FROM "Show" '
+            'WHERE "Show".{fk} = "{table}".id AND "Show"."startTime" <= CURRENT_TIMESTAMP)'.format(
+                table=table, fk=foreign_key))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
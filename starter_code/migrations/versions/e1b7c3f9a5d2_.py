@@ -0,0 +1,46 @@
+"""FTS5 update triggers only on the indexed columns
+
+Revision ID: e1b7c3f9a5d2
+Revises: a4f0c8d2e6b1
+Create Date: 2026-10-19 10:24:08.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c3f9a5d2'
+down_revision = 'a4f0c8d2e6b1'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def create_update_trigger(table, column_list):
+    fts = table + '_fts'
+    columns = ', '.join(COLUMNS)
+    new = ', '.join('new.' + column for column in COLUMNS)
+    old = ', '.join('old.' + column for column in COLUMNS)
+    op.execute('DROP TRIGGER IF EXISTS "{fts}_au"'.format(fts=fts))
+    op.execute('CREATE TRIGGER "{fts}_au" AFTER UPDATE {of}ON "{table}" BEGIN '
+               'INSERT INTO "{fts}"("{fts}", rowid, {columns}) VALUES (\'delete\', old.id, {old}); '
+               'INSERT INTO "{fts}"(rowid, {columns}) VALUES (new.id, {new}); END'.format(
+                   fts=fts, table=table, columns=columns, old=old, new=new,
+                   of='OF %s ' % columns if column_list else ''))
+
+
+def upgrade():
+    # the counter and updated_at writes on every show insert and rollover
+    # rewrote the FTS rows; postgres computes search_vector itself
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            create_update_trigger(table, column_list=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            create_update_trigger(table, column_list=False)
@@ -0,0 +1,64 @@
+"""canonical E.164 phone column on Venue and Artist
+
+Revision ID: f19c6a2d7b40
+Revises: 6e2b18f0a3c9
+Create Date: 2026-10-18 16:40:18.006512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import phonenumbers
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19c6a2d7b40'
+down_revision = '6e2b18f0a3c9'
+branch_labels = None
+depends_on = None
+
+
+def e164(number):
+    try:
+        parsed = phonenumbers.parse(number, 'US')
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    connection = op.get_bind()
+    normalized = {}
+    for table_name in ('Venue', 'Artist'):
+        op.add_column(table_name, sa.Column('phone_e164', sa.String(length=20), nullable=True))
+        table = sa.table(table_name, sa.column('id'), sa.column('phone'), sa.column('phone_e164'))
+        # phone is not indexed: read (id, phone) in primary key batches and
+        # write each batch back by id with one executemany
+        update = table.update().where(table.c.id == sa.bindparam('row_id')) \
+            .values(phone_e164=sa.bindparam('e164'))
+        last_id = None
+        while True:
+            batch = sa.select(table.c.id, table.c.phone).where(table.c.phone.isnot(None))
+            if last_id is not None:
+                batch = batch.where(table.c.id > last_id)
+            rows = connection.execute(batch.order_by(table.c.id).limit(BATCH_SIZE)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            params = []
+            for id, phone in rows:
+                if phone not in normalized:
+                    normalized[phone] = e164(phone)
+                if normalized[phone] is not None:
+                    params.append({'row_id': id, 'e164': normalized[phone]})
+            if params:
+                connection.execute(update, params)
+
+
+def downgrade():
+    op.drop_column('Artist', 'phone_e164')
+    op.drop_column('Venue', 'phone_e164')
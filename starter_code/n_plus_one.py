@@ -0,0 +1,161 @@
+import itertools
+import os
+import re
+import threading
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request
+from flask import request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# N+1 query detection for development and tests.
+#
+# While a request (or a guard() block) is running, every SQL statement is
+# fingerprinted -- literals, numbers and IN lists replaced by placeholders --
+# and attributed to the innermost application frame that issued it. The same
+# fingerprint issued threshold times or more from one call site within one
+# request (or outside of any) is a query in a loop; in a request it is logged
+# with the view, file, line and count, and guard() raises NPlusOneError with
+# the same information. A guard() around several requests counts each apart,
+# so requesting /venues/1, /venues/2 and /venues/3 is not a loop.
+
+Repeat = namedtuple('Repeat', 'view filename lineno function count statement')
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%\(\w+\)s|:\w+|\$\d+'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+_active = threading.local()
+_requests = itertools.count(1)
+_library = os.sep + 'site-packages' + os.sep
+
+
+class NPlusOneError(AssertionError):
+
+    def __init__(self, repeats):
+        AssertionError.__init__(self, '\n'.join(describe(repeat) for repeat in repeats))
+        self.repeats = repeats
+
+
+def fingerprint(statement):
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def describe(repeat):
+    return '%s: %s:%d in %s() ran %d times: %s' % (
+        repeat.view or '-', repeat.filename, repeat.lineno, repeat.function, repeat.count, repeat.statement)
+
+
+class Recorder(object):
+
+    def __init__(self, root):
+        self.root = root
+        self.counts = {}
+
+    def call_site(self):
+        for frame in reversed(traceback.extract_stack()):
+            if frame.filename.startswith(self.root) and _library not in frame.filename \
+                    and frame.filename != __file__:
+                return frame.filename, frame.lineno, frame.name
+        return '?', 0, '?'
+
+    def record(self, statement):
+        if has_request_context():
+            serial = request.environ.setdefault('n_plus_one.request', next(_requests))
+            view = request.endpoint
+        else:
+            serial, view = 0, None
+        key = (serial, view, self.call_site(), fingerprint(statement))
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def repeats(self, threshold):
+        return [Repeat(view, os.path.relpath(filename, self.root), lineno, function, count, statement)
+                for (serial, view, (filename, lineno, function), statement), count in sorted(self.counts.items())
+                if count >= threshold]
+
+
+def _recorders():
+    if not hasattr(_active, 'recorders'):
+        _active.recorders = []
+    return _active.recorders
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for recorder in _recorders():
+        recorder.record(statement)
+
+
+def _listen():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+@contextmanager
+def guard(threshold=None, root=None):
+    # raises NPlusOneError if a statement repeats `threshold` times from one
+    # call site inside the block
+    if threshold is None:
+        threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+    _listen()
+    recorder = Recorder(root or current_app.root_path)
+    _recorders().append(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorders().remove(recorder)
+    repeats = recorder.repeats(threshold)
+    if repeats:
+        raise NPlusOneError(repeats)
+
+
+def fixture(threshold=None):
+    # in a conftest.py:  no_n_plus_one = n_plus_one.fixture()
+    import pytest
+
+    @pytest.fixture
+    def no_n_plus_one(app):
+        with app.app_context():
+            with guard(threshold, app.root_path) as recorder:
+                yield recorder
+    return no_n_plus_one
+
+
+class NPlusOneDetector(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('N_PLUS_ONE_DETECTION', app.debug)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 3)
+        app.extensions['n_plus_one'] = self
+        if not app.config['N_PLUS_ONE_DETECTION']:
+            return
+        _listen()
+        request_started.connect(self._request_started, app)
+        app.teardown_request(self._teardown_request)
+
+    def _request_started(self, sender, **extra):
+        if not sender.config['N_PLUS_ONE_DETECTION']:
+            return
+        request.environ['n_plus_one.recorder'] = recorder = Recorder(sender.root_path)
+        _recorders().append(recorder)
+
+    def _teardown_request(self, error=None):
+        recorder = request.environ.pop('n_plus_one.recorder', None)
+        if recorder is None:
+            return
+        if recorder in _recorders():
+            _recorders().remove(recorder)
+        for repeat in recorder.repeats(current_app.config['N_PLUS_ONE_THRESHOLD']):
+            current_app.logger.warning('N+1 query: %s', describe(repeat))
@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, false, or_
+
+# Keyset ("seek") pagination.
+#
+# A page is fetched with WHERE (c1, c2, ...) > (v1, v2, ...) ORDER BY c1, c2, ...
+# LIMIT n, where the values come from the last row of the previous page, so the
+# database starts at the right place in the index instead of counting past
+# OFFSET rows. Cursors are opaque url-safe strings carrying those values and
+# the direction of travel.
+#
+# Ordering columns may hold NULL. The ORDER BY spells out where NULLs go, and
+# the seek predicate treats them the same way: after every value on postgres,
+# before every value elsewhere -- in both cases where the database's own
+# indexes keep them, so the order is still read straight off the index.
+
+
+class Page(object):
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['t'])
+    return value
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps({'d': direction, 'k': [_dump(value) for value in values]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    # raises ValueError for anything that is not a cursor we issued
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        direction, values = payload['d'], [_load(value) for value in payload['k']]
+    except (TypeError, KeyError, AttributeError) as e:
+        raise ValueError('invalid cursor') from e
+    if direction not in ('next', 'prev') or len(values) != size:
+        raise ValueError('invalid cursor')
+    return direction, values
+
+
+def nulls_sort_high(session):
+    return session.get_bind().dialect.name in ('postgresql', 'oracle')
+
+
+def _nullable(column):
+    return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+
+def _beyond(column, value, after, nulls_high):
+    # rows strictly after (or before) `value` in the ascending order
+    nulls_beyond = after == nulls_high
+    if value is None:
+        return column.is_not(None) if not nulls_beyond else false()
+    beyond = column > value if after else column < value
+    if nulls_beyond and _nullable(column):
+        return or_(beyond, column.is_(None))
+    return beyond
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def seek(columns, values, after=True, nulls_high=False):
+    # (c1, c2) > (v1, v2) spelled out so it also works without row-value support
+    column, value = columns[0], values[0]
+    beyond = _beyond(column, value, after, nulls_high)
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, and_(_equal(column, value), seek(columns[1:], values[1:], after, nulls_high)))
+
+
+def order(columns, forward, nulls_high):
+    if forward:
+        return [column.nulls_last() if nulls_high else column.nulls_first() for column in columns]
+    return [column.desc().nulls_first() if nulls_high else column.desc().nulls_last() for column in columns]
+
+
+def paginate(query, columns, key, cursor=None, per_page=50):
+    # `columns` is the ordering key, `key(row)` extracts its values from a row
+    direction, values = ('next', None) if not cursor else decode_cursor(cursor, len(columns))
+    forward = direction == 'next'
+    nulls_high = nulls_sort_high(query.session)
+    if values is not None:
+        query = query.filter(seek(columns, values, forward, nulls_high))
+    query = query.order_by(*order(columns, forward, nulls_high))
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return Page(rows)
+    next_cursor = encode_cursor(key(rows[-1]), 'next') if (more or not forward) else None
+    prev_cursor = encode_cursor(key(rows[0]), 'prev') if (more if not forward else values is not None) else None
+    return Page(rows, next_cursor, prev_cursor)
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+import phonenumbers
+
+# Phone number validation and normalization.
+#
+# Numbers are stored as entered in `phone` and in canonical E.164 form in
+# `phone_e164`. Parsing is the expensive part, and imports and edits send the
+# same numbers over and over, so results are memoized in a bounded LRU.
+
+DEFAULT_REGION = 'US'
+
+
+@lru_cache(maxsize=65536)
+def normalize(number, region=DEFAULT_REGION):
+    # E.164 string for a valid number, None otherwise
+    if not number:
+        return None
+    try:
+        parsed = phonenumbers.parse(number, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def is_valid(number, region=DEFAULT_REGION):
+    return normalize(number, region) is not None
+
+
+def normalize_many(numbers, region=DEFAULT_REGION):
+    # one result per input, in order; each distinct number is parsed at most once
+    results = {}
+    for number in numbers:
+        if number not in results:
+            results[number] = normalize(number, region)
+    return [results[number] for number in numbers]
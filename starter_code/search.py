@@ -0,0 +1,61 @@
+import re
+
+# Full-text search helpers shared by the search views.
+#
+# On PostgreSQL, Venue and Artist carry a generated `search_vector` tsvector
+# column with a GIN index (see the migrations). On SQLite an FTS5 table named
+# `<Table>_fts` mirrors the same columns and is kept in sync by triggers.
+
+SEARCH_COLUMNS = ('name', 'city', 'state', 'genres')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def terms(search_term):
+    return [term.lower() for term in _TERM.findall(search_term or '')]
+
+
+def tsquery(search_term):
+    # every word must match, and the last one may still be being typed
+    return ' & '.join(term + ':*' for term in terms(search_term))
+
+
+def fts5_query(search_term):
+    return ' '.join('"%s"*' % term for term in terms(search_term))
+
+
+def fts5_table(table):
+    return table + '_fts'
+
+
+def fts5_ddl(table):
+    fts = fts5_table(table)
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join('new.' + column for column in SEARCH_COLUMNS)
+    old_values = ', '.join('old.' + column for column in SEARCH_COLUMNS)
+    return [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5({columns}, '
+        'content=\'{table}\', content_rowid=\'id\')'.format(fts=fts, columns=columns, table=table),
+        'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+        'INSERT INTO "{fts}"(rowid, {columns}) VALUES (new.id, {new}); END'.format(
+            fts=fts, table=table, columns=columns, new=new_values),
+        'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+        'INSERT INTO "{fts}"("{fts}", rowid, {columns}) VALUES (\'delete\', old.id, {old}); END'.format(
+            fts=fts, table=table, columns=columns, old=old_values),
+        # only on the indexed columns: counter and updated_at writes leave it alone
+        'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE OF {columns} ON "{table}" BEGIN '
+        'INSERT INTO "{fts}"("{fts}", rowid, {columns}) VALUES (\'delete\', old.id, {old}); '
+        'INSERT INTO "{fts}"(rowid, {columns}) VALUES (new.id, {new}); END'.format(
+            fts=fts, table=table, columns=columns, old=old_values, new=new_values),
+        'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')'.format(fts=fts),
+    ]
+
+
+def fts5_drop_ddl(table):
+    fts = fts5_table(table)
+    return [
+        'DROP TRIGGER IF EXISTS "{fts}_ai"'.format(fts=fts),
+        'DROP TRIGGER IF EXISTS "{fts}_ad"'.format(fts=fts),
+        'DROP TRIGGER IF EXISTS "{fts}_au"'.format(fts=fts),
+        'DROP TABLE IF EXISTS "{fts}"'.format(fts=fts),
+    ]
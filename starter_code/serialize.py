@@ -0,0 +1,26 @@
+import json
+from datetime import date
+
+# JSON encoding for the API. orjson is used when it is installed (it is several
+# times faster and encodes datetimes natively); otherwise the standard library
+# encoder produces the same output. Records (see streaming.record) encode as
+# their _asdict().
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, '_asdict'):
+        return value._asdict()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
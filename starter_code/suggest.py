@@ -0,0 +1,100 @@
+import re
+import threading
+from bisect import bisect_left, insort
+
+# In-memory type-ahead index for artist and venue names.
+#
+# Entries live in one sorted list of (key, kind, id) tuples, one per word of
+# the name, so "hop" finds "The Musical Hop". A prefix lookup is a bisect plus
+# a short forward scan. The index holds at most `max_entries` keys; past that
+# new names are not indexed and `truncated` is set until the next rebuild.
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    return ' '.join(_WORD.findall((text or '').lower()))
+
+
+class PrefixIndex(object):
+
+    def __init__(self, max_entries=200000, max_key_length=64):
+        self.max_entries = max_entries
+        self.max_key_length = max_key_length
+        self.loaded = False
+        self.truncated = False
+        self._keys = []
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _keys_for(self, name):
+        words = normalize(name).split(' ')
+        return {' '.join(words[i:])[:self.max_key_length] for i in range(len(words)) if words[i]}
+
+    def _add(self, kind, id, name):
+        keys = self._keys_for(name)
+        if len(self._keys) + len(keys) > self.max_entries:
+            self.truncated = True
+            return
+        for key in keys:
+            insort(self._keys, (key, kind, id))
+        self._entries[(kind, id)] = (name, keys)
+
+    def _remove(self, kind, id):
+        entry = self._entries.pop((kind, id), None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            position = bisect_left(self._keys, (key, kind, id))
+            if position < len(self._keys) and self._keys[position] == (key, kind, id):
+                del self._keys[position]
+
+    def add(self, kind, id, name):
+        with self._lock:
+            self._remove(kind, id)
+            self._add(kind, id, name)
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._remove(kind, id)
+
+    def rebuild(self, rows):
+        # rows: iterable of (kind, id, name)
+        keys = []
+        entries = {}
+        truncated = False
+        for kind, id, name in rows:
+            name_keys = self._keys_for(name)
+            if len(keys) + len(name_keys) > self.max_entries:
+                truncated = True
+                break
+            keys.extend((key, kind, id) for key in name_keys)
+            entries[(kind, id)] = (name, name_keys)
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._entries = entries
+            self.truncated = truncated
+            self.loaded = True
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and len(results) < limit:
+                key, kind, id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                if (kind, id) not in seen:
+                    seen.add((kind, id))
+                    results.append({"type": kind, "id": id, "name": self._entries[(kind, id)][0]})
+                position += 1
+        return results
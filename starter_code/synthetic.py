@@ -0,0 +1,151 @@
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+import phones
+from app import db, Venue, Artist, Show, COUNTED_BY, recount_shows, relink_genres, show_length
+from genres import DEFAULT_GENRES
+
+# Synthetic catalogs for benchmarks.
+#
+# Everything is drawn from one seeded random.Random, so the same arguments give
+# the same catalog. Popularity is skewed: low-numbered venues, artists and
+# cities get most of the rows, the way a few big rooms and touring acts do in
+# real listings. Show times cluster around today, thinning out exponentially
+# into the past and the future, in evening slots, with at most one show per
+# venue and per artist an evening so nothing is double-booked. Rows are
+# written with Core executemany in batches; counters and genre links are
+# rebuilt for the new rows at the end.
+
+CITIES = [
+    ('San Francisco', 'CA', '415'), ('New York', 'NY', '212'), ('Los Angeles', 'CA', '213'),
+    ('Chicago', 'IL', '312'), ('Austin', 'TX', '512'), ('Nashville', 'TN', '615'),
+    ('Brooklyn', 'NY', '718'), ('Seattle', 'WA', '206'), ('New Orleans', 'LA', '504'),
+    ('Portland', 'OR', '503'), ('Atlanta', 'GA', '404'), ('Denver', 'CO', '303'),
+    ('Boston', 'MA', '617'), ('Detroit', 'MI', '313'), ('Miami', 'FL', '305'),
+    ('Houston', 'TX', '713'), ('Minneapolis', 'MN', '612'), ('Philadelphia', 'PA', '215'),
+]
+GENRES = DEFAULT_GENRES
+ADJECTIVES = ['Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Rusty', 'Silver', 'Crimson', 'Lucky',
+              'Wild', 'Hollow', 'Neon', 'Broken', 'Quiet', 'Little', 'Grand', 'Lost', 'Northern']
+NOUNS = ['Room', 'Hall', 'Tavern', 'Lounge', 'Garden', 'Cellar', 'Theatre', 'Barn', 'Palace', 'Den',
+         'Ballroom', 'Factory', 'Saloon', 'Club', 'Warehouse', 'Pavilion']
+BANDS = ['Wolves', 'Sparrows', 'Machines', 'Daughters', 'Ghosts', 'Rivers', 'Kings', 'Lanterns',
+         'Satellites', 'Horses', 'Strangers', 'Tigers', 'Echoes', 'Saints', 'Owls', 'Comets']
+WORDS = ADJECTIVES + NOUNS + BANDS
+
+
+def skewed(rng, n, skew=3.0):
+    # index in [0, n) with a heavy head: P(i) falls off roughly as a power law
+    return min(n - 1, int(n * rng.random() ** skew))
+
+
+def phone(rng, area_code):
+    # 555-01XX numbers are reserved for fiction
+    return '%s-555-01%02d' % (area_code, rng.randrange(100))
+
+
+def genres(rng):
+    return ','.join(sorted(set(GENRES[skewed(rng, len(GENRES), 2.0)] for _ in range(rng.randint(1, 3)))))
+
+
+def venue_row(rng, i):
+    city, state, area_code = CITIES[skewed(rng, len(CITIES), 2.0)]
+    number = phone(rng, area_code)
+    name = 'The %s %s' % (rng.choice(ADJECTIVES), rng.choice(NOUNS))
+    return {
+        'name': '%s %d' % (name, i) if rng.random() < 0.5 else name,
+        'city': city,
+        'state': state,
+        'address': '%d %s Street' % (rng.randint(1, 3000), rng.choice(ADJECTIVES)),
+        'phone': number,
+        'phone_e164': phones.normalize(number),
+        'genres': genres(rng),
+        'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+        'facebook_link': 'https://www.facebook.com/venue%d' % i,
+        'website': 'https://venue%d.example.com' % i,
+        'seeking_talent': rng.random() < 0.3,
+        'seeking_description': None,
+    }
+
+
+def artist_row(rng, i):
+    city, state, area_code = CITIES[skewed(rng, len(CITIES), 2.0)]
+    number = phone(rng, area_code)
+    return {
+        'name': '%s %s %d' % (rng.choice(ADJECTIVES), rng.choice(BANDS), i),
+        'city': city,
+        'state': state,
+        'phone': number,
+        'phone_e164': phones.normalize(number),
+        'genres': genres(rng),
+        'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+        'facebook_link': 'https://www.facebook.com/artist%d' % i,
+        'website': 'https://artist%d.example.com' % i,
+        'seeking_venue': rng.random() < 0.3,
+        'seeking_description': None,
+    }
+
+
+def show_time(rng, today):
+    # about a quarter upcoming; both sides thin out over roughly two months
+    days = min(rng.expovariate(1 / 60.0), 3 * 365)
+    day = today + timedelta(days=int(days) if rng.random() < 0.25 else -int(days) - 1)
+    return day.replace(hour=rng.randint(18, 23), minute=rng.choice((0, 30)))
+
+
+def show_rows(rng, count, venue_ids, artist_ids, today, length, attempts=20):
+    # a venue or artist already playing that evening is redrawn, so booked-up
+    # favourites pass their shows on; (id, day) pairs are packed into ints
+    booked = set()
+    for _ in range(count):
+        for _ in range(attempts):
+            venue_id = venue_ids[skewed(rng, len(venue_ids))]
+            artist_id = artist_ids[skewed(rng, len(artist_ids))]
+            start = show_time(rng, today)
+            day = start.toordinal()
+            venue_key, artist_key = (venue_id << 21 | day) << 1, (artist_id << 21 | day) << 1 | 1
+            if venue_key not in booked and artist_key not in booked:
+                break
+        else:
+            continue
+        booked.update((venue_key, artist_key))
+        yield {
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'startTime': start,
+            'endTime': start + length,
+        }
+
+
+def insert(model, rows, batch_size, progress):
+    # returns the ids of the inserted rows
+    first = (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+    rows = iter(rows)
+    total = 0
+    batch = list(islice(rows, batch_size))
+    while batch:
+        db.session.execute(model.__table__.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+        progress('%s: %d rows' % (model.__tablename__, total))
+        batch = list(islice(rows, batch_size))
+    return [id for id, in db.session.query(model.id).filter(model.id >= first).order_by(model.id)]
+
+
+def generate(venues=10000, artists=100000, shows=1000000, seed=0, batch_size=10000, progress=print):
+    rng = random.Random(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    venue_ids = insert(Venue, (venue_row(rng, i) for i in range(venues)), batch_size, progress)
+    artist_ids = insert(Artist, (artist_row(rng, i) for i in range(artists)), batch_size, progress)
+    if venue_ids and artist_ids:
+        insert(Show, show_rows(rng, shows, venue_ids, artist_ids, today, show_length()), batch_size, progress)
+    # Core inserts skip the counter and genre hooks
+    now = datetime.now()
+    for model, show_fk in COUNTED_BY:
+        recount_shows(model, show_fk, now)
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        if ids:
+            relink_genres(model, db.session.query(model.id).filter(model.id >= ids[0]))
+    db.session.commit()
+    return len(venue_ids), len(artist_ids)
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+# The app reads DATABASE_URL when it is imported; the tests get a throwaway
+# SQLite file, created and dropped around every test.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='fyyur-tests-'), 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import n_plus_one
+import search
+from app import app as fyyur, db, Venue, Artist, Show
+from app import genre_registry, response_cache, suggestions, tonight_cache, _fts_tables
+
+
+@pytest.fixture
+def app():
+    fyyur.config['WTF_CSRF_ENABLED'] = False
+    with fyyur.app_context():
+        db.create_all()
+    yield fyyur
+    with fyyur.app_context():
+        db.session.remove()
+        db.drop_all()
+        with db.engine.begin() as connection:
+            for table in ('Venue', 'Artist'):
+                for statement in search.fts5_drop_ddl(table):
+                    connection.execute(text(statement))
+    # process-wide state that would otherwise outlive the database
+    genre_registry.reset()
+    suggestions.rebuild([])
+    suggestions.loaded = False
+    tonight_cache.clear()
+    response_cache.clear()
+    _fts_tables.clear()
+
+
+# fails the test when a statement repeats N_PLUS_ONE_THRESHOLD times from one
+# line of code within a request
+no_n_plus_one = n_plus_one.fixture()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    # the SQL issued while the test runs; clear() it before the part measured
+    issued = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield issued
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def catalog(app):
+    # catalog(venues, artists) adds that many venues and artists spread over
+    # two cities, each venue with one upcoming and one past show
+    def add(venues=3, artists=3, cities=(('San Francisco', 'CA'), ('New York', 'NY'))):
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        with app.app_context():
+            artist_rows = []
+            for i in range(artists):
+                city, state = cities[i % len(cities)]
+                artist_rows.append(Artist(name='Artist %d' % i, city=city, state=state, genres='Rock n Roll'))
+            db.session.add_all(artist_rows)
+            for i in range(venues):
+                city, state = cities[i % len(cities)]
+                venue = Venue(name='Venue %d' % i, city=city, state=state, genres='Jazz')
+                artist = artist_rows[i % len(artist_rows)]
+                db.session.add(venue)
+                db.session.add(Show(venue=venue, artist=artist, startTime=now + timedelta(days=1 + i)))
+                db.session.add(Show(venue=venue, artist=artist, startTime=now - timedelta(days=1 + i)))
+            db.session.commit()
+    return add
@@ -0,0 +1,36 @@
+from app import db, Venue, Artist
+
+
+def add_genres(app):
+    with app.app_context():
+        for i, genres in enumerate(['Jazz,Blues', 'Jazz', 'Blues', 'Blues,Jazz,Folk', 'Folk,Jazz']):
+            db.session.add(Venue(name='Venue %d' % i, city='San Francisco', state='CA', genres=genres))
+            db.session.add(Artist(name='Artist %d' % i, city='San Francisco', state='CA', genres=genres))
+        db.session.commit()
+
+
+def follow(client, url):
+    # every item across the pages, and the links that got there
+    items, links = [], []
+    while url:
+        payload = client.get(url).get_json()
+        items += payload['data']
+        url = payload['links'].get('next')
+        if url:
+            links.append(url)
+    return items, links
+
+
+def test_genre_filter_survives_paging(client, app):
+    add_genres(app)
+    for kind in ('venues', 'artists'):
+        items, links = follow(client, '/api/v1/%s?genre=Jazz&genre=Blues&per_page=1' % kind)
+        assert [item['name'] for item in items] == ['%s 0' % kind[:-1].title(), '%s 3' % kind[:-1].title()]
+        assert links and all(link.count('genre=') == 2 for link in links)
+
+
+def test_genre_counts(client, app):
+    add_genres(app)
+    counts = {row['name']: row for row in client.get('/api/v1/genres').get_json()['data']}
+    assert (counts['Jazz']['venues'], counts['Jazz']['artists']) == (4, 4)
+    assert (counts['Folk']['venues'], counts['Folk']['artists']) == (2, 2)
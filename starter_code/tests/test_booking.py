@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import db, Show, show_length
+from booking import BookingError
+
+
+def free_slots(client, start, end, aware=False):
+    if aware:
+        start, end = (moment.astimezone(timezone.utc) for moment in (start, end))
+    response = client.get('/api/v1/artists/1/free-slots', query_string={
+        'city': 'San Francisco', 'from': start.isoformat(), 'to': end.isoformat()})
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_free_slots_skip_the_booked_show(client, catalog):
+    catalog(venues=1, artists=1)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    slots = free_slots(client, start, start + timedelta(days=3))
+    assert [venue['venue_name'] for venue in slots] == ['Venue 0']
+    booked = (start + timedelta(days=1)).isoformat()
+    assert [slot['end'] for slot in slots[0]['slots']][0] == booked
+
+
+def test_free_slots_with_utc_offsets(client, catalog):
+    catalog(venues=1, artists=1)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=3)
+    assert free_slots(client, start, end, aware=True) == free_slots(client, start, end)
+
+
+def test_double_booking_is_rejected(app, catalog):
+    catalog(venues=1, artists=1)
+    with app.app_context():
+        show = db.session.query(Show).order_by(Show.startTime.desc()).first()
+        db.session.add(Show(venue_id=show.venue_id, artist_id=show.artist_id,
+                            startTime=show.startTime + timedelta(minutes=30)))
+        with pytest.raises(BookingError) as error:
+            db.session.flush()
+        db.session.rollback()
+    assert len(error.value.conflicts) == 1
+
+
+def test_double_booking_in_one_flush_is_rejected(app, catalog):
+    catalog(venues=1, artists=2)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=10)
+    with app.app_context():
+        db.session.add(Show(venue_id=1, artist_id=1, startTime=start))
+        db.session.add(Show(venue_id=1, artist_id=2, startTime=start + timedelta(hours=1)))
+        with pytest.raises(BookingError):
+            db.session.commit()
+        db.session.rollback()
+        # back to back is fine, and the failed flush left nothing behind
+        db.session.add(Show(venue_id=1, artist_id=1, startTime=start))
+        db.session.add(Show(venue_id=1, artist_id=2, startTime=start + show_length()))
+        db.session.commit()
+        assert db.session.query(Show).filter(Show.startTime >= start).count() == 2
@@ -0,0 +1,68 @@
+import fnmatch
+
+from cache import MemoryBackend, RedisBackend
+
+
+class FakeRedis(object):
+    # the part of redis-py that RedisBackend uses
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def mset(self, mapping):
+        self.data.update(mapping)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+
+def store(backend, key, value, tags):
+    backend.set(key, (value, backend.versions(tags)))
+
+
+def lookup(backend, key):
+    entry = backend.get(key)
+    if entry is not None and backend.versions(entry[1]) == entry[1]:
+        return entry[0]
+    return None
+
+
+def check_backend(backend):
+    backend.bump(['venue:1'])
+    store(backend, 'view:/venues/1', 'page 1', ['venue:1', 'venues'])
+    store(backend, 'view:/venues/2', 'page 2', ['venue:2'])
+    assert lookup(backend, 'view:/venues/1') == 'page 1'
+    backend.bump(['venue:2'])
+    assert lookup(backend, 'view:/venues/1') == 'page 1'
+    assert lookup(backend, 'view:/venues/2') is None
+    store(backend, 'view:/venues/2', 'page 2', ['venue:2'])
+    store(backend, 'view:/artists', 'artists', ['artists'])
+    backend.clear()
+    assert lookup(backend, 'view:/venues/1') is None
+    assert lookup(backend, 'view:/venues/2') is None
+    assert lookup(backend, 'view:/artists') is None
+
+
+def test_memory_backend():
+    check_backend(MemoryBackend())
+
+
+def test_redis_backend_clear_evicts_everything():
+    check_backend(RedisBackend(FakeRedis()))
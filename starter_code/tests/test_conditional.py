@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app import db, Venue, Show
+
+
+def test_etag_revalidation(client, catalog):
+    catalog()
+    response = client.get('/venues')
+    assert response.status_code == 200
+    assert client.get('/venues', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_delete_is_not_hidden_by_if_modified_since(app, client):
+    with app.app_context():
+        db.session.add(Venue(name='Old Hall', city='Oakland', state='CA'))
+        db.session.commit()
+        db.session.add(Venue(name='New Hall', city='Oakland', state='CA'))
+        db.session.commit()
+    response = client.get('/venues')
+    # the stamp counts venues, which a timestamp cannot stand for
+    assert 'Last-Modified' not in response.headers
+    with app.app_context():
+        db.session.delete(Venue.query.filter_by(name='Old Hall').one())
+        db.session.commit()
+    response = client.get('/venues', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert response.status_code == 200
+    assert 'Old Hall' not in response.get_data(as_text=True)
+
+
+def test_timestamp_stamps_keep_last_modified(client, catalog):
+    catalog()
+    response = client.get('/shows')
+    assert response.last_modified is not None
+    response = client.get('/shows', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 304
+
+
+def test_cached_page_follows_the_stamp(app, client, catalog):
+    catalog(venues=1, artists=1)
+    first = client.get('/venues/1')
+    assert '1 Upcoming Show' in first.get_data(as_text=True)
+    assert client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    with app.app_context():
+        # the show starts: nothing is flushed, so no cache tag moves
+        db.session.execute(Show.__table__.update().where(Show.__table__.c.startTime > datetime.now())
+                           .values(startTime=datetime.now() - timedelta(minutes=5),
+                                   updated_at=Show.__table__.c.updated_at))
+        db.session.commit()
+    second = client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    body = second.get_data(as_text=True)
+    assert '0 Upcoming Shows' in body and '2 Past Shows' in body
+    assert client.get('/venues/1', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from app import db, Show, COUNTED_BY, actual_show_counts
+
+
+def counters(app):
+    with app.app_context():
+        return [(model.__tablename__, id, upcoming, past)
+                for model, _ in COUNTED_BY
+                for id, upcoming, past in db.session.query(model.id, model.upcoming_shows_count,
+                                                           model.past_shows_count).order_by(model.id)]
+
+
+def drift(app):
+    now = datetime.now()
+    with app.app_context():
+        return [row for model, show_fk in COUNTED_BY
+                for row in actual_show_counts(model, show_fk, now) if row[1:3] != row[3:5]]
+
+
+def test_counters_follow_inserts_and_deletes(app, catalog):
+    catalog(venues=2, artists=1)
+    assert counters(app) == [('Venue', 1, 1, 1), ('Venue', 2, 1, 1), ('Artist', 1, 2, 2)]
+    with app.app_context():
+        db.session.delete(db.session.query(Show).filter(Show.venue_id == 2).order_by(Show.id).first())
+        db.session.commit()
+    assert counters(app) == [('Venue', 1, 1, 1), ('Venue', 2, 0, 1), ('Artist', 1, 1, 2)]
+    assert drift(app) == []
+
+
+def test_deleting_a_started_show_before_rollover(app, catalog):
+    catalog(venues=1, artists=1)
+    with app.app_context():
+        show_id = db.session.query(Show.id).filter(Show.startTime > datetime.now()).scalar()
+        # the show starts; rollover-shows has not run yet
+        db.session.execute(Show.__table__.update().where(Show.__table__.c.id == show_id)
+                           .values(startTime=datetime.now() - timedelta(minutes=5)))
+        db.session.commit()
+    assert counters(app) == [('Venue', 1, 1, 1), ('Artist', 1, 1, 1)]
+    with app.app_context():
+        db.session.delete(db.session.get(Show, show_id))
+        db.session.commit()
+    assert counters(app) == [('Venue', 1, 0, 1), ('Artist', 1, 0, 1)]
+    assert drift(app) == []
@@ -0,0 +1,38 @@
+import re
+from html import unescape
+
+from app import db, Venue
+
+
+def add_venues(app):
+    with app.app_context():
+        for i, genres in enumerate(['Jazz,Blues', 'Jazz', 'Blues,Jazz', 'Jazz,Blues,Folk', 'Folk']):
+            db.session.add(Venue(name='Venue %d' % i, city='San Francisco', state='CA', genres=genres))
+        db.session.commit()
+
+
+def venue_names(body):
+    return re.findall(r'<h5>(Venue \d+)</h5>', body)
+
+
+def next_link(body):
+    match = re.search(r'<li class="next"><a href="([^"]+)"', body)
+    return unescape(match.group(1)) if match else None
+
+
+def test_genre_facet_counts(client, app):
+    add_venues(app)
+    body = client.get('/venues?genre=Jazz').get_data(as_text=True)
+    assert sorted(venue_names(body)) == ['Venue 0', 'Venue 1', 'Venue 2', 'Venue 3']
+
+
+def test_pager_keeps_every_selected_value(client, app):
+    add_venues(app)
+    url, seen = '/venues?genre=Jazz&genre=Blues&per_page=1', []
+    while url:
+        body = client.get(url).get_data(as_text=True)
+        seen += venue_names(body)
+        url = next_link(body)
+        if url:
+            assert url.count('genre=') == 2
+    assert seen == ['Venue 0', 'Venue 2', 'Venue 3']
@@ -0,0 +1,75 @@
+import json
+
+from app import db, Venue, Artist, Show
+
+
+def write_ndjson(path, rows):
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    return str(path)
+
+
+def run_import(app, kind, path, *options):
+    result = app.test_cli_runner().invoke(args=['import', kind, path] + list(options))
+    assert result.exception is None, result.output
+    return result.output
+
+
+def test_import_seeking_venues_and_artists(app, tmp_path):
+    venues = write_ndjson(tmp_path / 'venues.ndjson', [
+        {'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+         'genres': 'Jazz,Folk', 'seeking_talent': 'y', 'seeking_description': 'Local jazz acts'},
+        {'name': 'Park Square', 'city': 'San Francisco', 'state': 'CA', 'address': '34 Whiskey Moore Ave',
+         'genres': 'Rock n Roll', 'seeking_talent': ''},
+    ])
+    artists = write_ndjson(tmp_path / 'artists.ndjson', [
+        {'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'phone': '415-864-9200',
+         'genres': 'Rock n Roll', 'seeking_venue': True, 'seeking_description': 'Looking for shows'},
+    ])
+    assert 'done: 2 inserted, 0 rejected' in run_import(app, 'venues', venues)
+    assert 'done: 1 inserted, 0 rejected' in run_import(app, 'artists', artists)
+    with app.app_context():
+        assert db.session.query(Venue.name, Venue.seeking_talent, Venue.seeking_description) \
+            .order_by(Venue.name).all() == [('Park Square', False, None),
+                                            ('The Musical Hop', True, 'Local jazz acts')]
+        assert db.session.query(Artist.seeking_venue, Artist.seeking_description).one() == \
+            (True, 'Looking for shows')
+
+
+def test_import_rejects_invalid_rows(app, tmp_path):
+    venues = write_ndjson(tmp_path / 'venues.ndjson', [
+        {'name': 'No Address', 'city': 'San Francisco', 'state': 'CA', 'genres': 'Jazz'},
+    ])
+    assert 'done: 0 inserted, 1 rejected' in run_import(app, 'venues', venues)
+    rejects = [json.loads(line) for line in (tmp_path / 'venues.ndjson.rejects.ndjson').read_text().splitlines()]
+    assert list(rejects[0]['errors']) == ['address']
+
+
+def test_resume_keeps_the_earlier_rejects(app, tmp_path):
+    rows = [
+        {'name': 'No Address', 'city': 'San Francisco', 'state': 'CA', 'genres': 'Jazz'},
+        {'name': 'Park Square', 'city': 'San Francisco', 'state': 'CA', 'address': '34 Whiskey Moore Ave',
+         'genres': 'Jazz'},
+    ]
+    venues = write_ndjson(tmp_path / 'venues.ndjson', rows[:1])
+    assert 'done: 0 inserted, 1 rejected' in run_import(app, 'venues', venues)
+    # as if that run had stopped after the first row of the whole file
+    write_ndjson(tmp_path / 'venues.ndjson', rows)
+    (tmp_path / 'venues.ndjson.checkpoint').write_text(json.dumps({'rows': 1}))
+    assert 'done: 1 inserted, 0 rejected' in run_import(app, 'venues', venues, '--resume')
+    rejects = (tmp_path / 'venues.ndjson.rejects.ndjson').read_text().splitlines()
+    assert [json.loads(line)['line'] for line in rejects] == [1]
+
+
+def test_exported_shows_import_back(app, client, catalog, tmp_path):
+    catalog(venues=2)
+    shows = tmp_path / 'shows.ndjson'
+    shows.write_bytes(client.get('/export/shows.ndjson?gzip=0').get_data())
+    with app.app_context():
+        exported = db.session.query(Show.venue_id, Show.artist_id, Show.startTime, Show.endTime) \
+            .order_by(Show.startTime).all()
+        db.session.query(Show).delete()
+        db.session.commit()
+    assert 'done: 4 inserted, 0 rejected' in run_import(app, 'shows', str(shows))
+    with app.app_context():
+        assert db.session.query(Show.venue_id, Show.artist_id, Show.startTime, Show.endTime) \
+            .order_by(Show.startTime).all() == exported
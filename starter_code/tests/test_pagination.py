@@ -0,0 +1,32 @@
+import re
+
+from app import db, Artist, Venue
+
+
+def walk(client, url):
+    # follows the Next links from `url`, returning the body of every page
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        pages.append(body)
+        links = re.findall(r'href="([^"]*cursor=[^"]*)"[^>]*>\s*Next', body)
+        url = links[0].replace('&amp;', '&') if links else None
+    return pages
+
+
+def test_pages_across_null_ordering_values(app, client, catalog):
+    catalog(venues=3, artists=3)
+    with app.app_context():
+        db.session.add_all([Venue(name='No State', city='Nowhere', state=None),
+                            Venue(name=None, city='Nowhere', state=None),
+                            Artist(name=None, city='Nowhere', state='CA')])
+        db.session.commit()
+        venues, artists = Venue.query.count(), Artist.query.count()
+
+    pages = walk(client, '/venues?per_page=1')
+    assert len(pages) == venues
+    assert any('No State' in body for body in pages)
+    assert all('Venue %d' % i in ''.join(pages) for i in range(3))
+    assert len(walk(client, '/artists?per_page=1')) == artists
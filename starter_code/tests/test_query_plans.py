@@ -0,0 +1,8 @@
+from app import hot_queries, query_plan, sequential_scans
+
+
+def test_hot_queries_use_indexes(app, catalog):
+    catalog()
+    with app.app_context():
+        scans = {name: sequential_scans(query_plan(query)) for name, query in hot_queries().items()}
+    assert {name: found for name, found in scans.items() if found} == {}
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from app import db, Venue
+from n_plus_one import NPlusOneError, guard
+
+
+@pytest.fixture
+def seeded(catalog):
+    # before no_n_plus_one, so the inserts are not counted
+    catalog(venues=6, artists=3)
+
+
+PAGES = ['/venues', '/artists', '/shows', '/shows/tonight/San%20Francisco',
+         '/api/v1/venues?include=shows', '/api/v1/artists?include=shows', '/api/v1/shows']
+
+
+def test_read_pages_have_no_n_plus_one(client, seeded, no_n_plus_one):
+    for url in PAGES:
+        assert client.get(url).status_code == 200, url
+    # the same view for several ids is not a loop
+    for id in (1, 2, 3):
+        for url in ('/venues/%d' % id, '/artists/%d' % id, '/api/v1/venues/%d' % id, '/api/v1/shows/%d' % id):
+            assert client.get(url).status_code == 200, url
+    assert client.post('/venues/search', data={'search_term': 'venue'}).status_code == 200
+    assert client.post('/artists/search', data={'search_term': 'artist'}).status_code == 200
+
+
+def test_guard_catches_a_query_in_a_loop(app, seeded):
+    with pytest.raises(NPlusOneError) as error:
+        with app.app_context(), guard():
+            for id in (1, 2, 3):
+                db.session.get(Venue, id)
+    assert error.value.repeats[0].count == 3
+    assert error.value.repeats[0].filename == os.path.join('tests', 'test_routes.py')
@@ -0,0 +1,49 @@
+from sqlalchemy import text
+
+import search
+from app import db, Venue
+
+
+def create_search_index(app):
+    with app.app_context(), db.engine.begin() as connection:
+        for table in ('Venue', 'Artist'):
+            for statement in search.fts5_ddl(table):
+                connection.execute(text(statement))
+
+
+def search_venues(client, term):
+    return client.post('/venues/search', data={'search_term': term}).get_data(as_text=True)
+
+
+def test_search_follows_renames(app, client, catalog):
+    catalog(venues=2)
+    create_search_index(app)
+    assert 'Venue 1' in search_venues(client, 'venue')
+    with app.app_context():
+        db.session.get(Venue, 2).name = 'The Musical Hop'
+        db.session.commit()
+    body = search_venues(client, 'musical')
+    assert 'The Musical Hop' in body
+    assert 'Venue 1' not in body
+
+
+def test_counter_updates_leave_the_search_index_alone(app, catalog):
+    catalog(venues=1)
+    create_search_index(app)
+    with app.app_context(), db.engine.begin() as connection:
+        # total_changes() counts the rows written by triggers as well
+        before = connection.execute(text('SELECT total_changes()')).scalar()
+        connection.execute(text('UPDATE "Venue" SET upcoming_shows_count = upcoming_shows_count + 1'))
+        assert connection.execute(text('SELECT total_changes()')).scalar() - before == 1
+        connection.execute(text('UPDATE "Venue" SET city = \'Oakland\''))
+        assert connection.execute(text('SELECT total_changes()')).scalar() - before > 2
+
+
+def test_only_the_candidate_limit_is_ranked(app, client, catalog, monkeypatch):
+    catalog(venues=4)
+    create_search_index(app)
+    monkeypatch.setitem(app.config, 'SEARCH_CANDIDATE_LIMIT', 2)
+    body = search_venues(client, 'venue')
+    assert sum('Venue %d' % i in body for i in range(4)) == 2
+    # a match outside the candidates when it is the only one is still found
+    assert 'Venue 3' in search_venues(client, 'venue 3')
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def local(moment):
+    # an aware time for the same instant as the naive local `moment`
+    return moment.astimezone(timezone.utc).isoformat()
+
+
+def test_calendar(client, catalog):
+    catalog(venues=3)
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    payload = client.get('/api/v1/shows/calendar/day').get_json()
+    assert sum(row['count'] for row in payload['data']) == 3
+    assert payload['data'][0]['start'] == tomorrow.isoformat()
+
+
+@pytest.mark.parametrize('query', [
+    {'from': 'offset'},
+    {'from': 'offset', 'to': 'naive'},
+    {'from': 'naive', 'to': 'offset'},
+    {'to': 'offset'},
+])
+def test_calendar_with_utc_offsets(client, catalog, query):
+    catalog(venues=3)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=10)
+    end = start + timedelta(days=30)
+    values = {'from': start, 'to': end}
+    args = {name: local(values[name]) if kind == 'offset' else values[name].isoformat()
+            for name, kind in query.items()}
+    response = client.get('/api/v1/shows/calendar/day', query_string=args)
+    assert response.status_code == 200
+    # without ?from= the window starts today
+    assert sum(row['count'] for row in response.get_json()['data']) == (6 if 'from' in query else 3)
+
+
+def test_shows_with_utc_offsets(client, catalog):
+    catalog(venues=3)
+    now = datetime.now()
+    response = client.get('/api/v1/shows', query_string={'from': local(now), 'to': local(now + timedelta(days=30))})
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 3
+    assert client.get('/shows', query_string={'from': local(now)}).status_code == 200
+
+
+def test_malformed_window(client):
+    assert client.get('/api/v1/shows/calendar/day?from=tomorrow').status_code == 400
+    assert client.get('/api/v1/shows?to=2026-13-01').status_code == 400
@@ -0,0 +1,33 @@
+from app import db, Venue, Artist
+
+
+def suggested(client, prefix):
+    return [item['name'] for item in client.get('/search/suggest?q=' + prefix).get_json()['data']]
+
+
+def test_suggest_follows_commits(app, client, catalog):
+    catalog(venues=1, artists=1)
+    assert suggested(client, 'venue') == ['Venue 0']
+    with app.app_context():
+        db.session.add(Artist(name='Venue Crashers'))
+        db.session.get(Venue, 1).name = 'The Musical Hop'
+        db.session.commit()
+    assert suggested(client, 'venue') == ['Venue Crashers']
+    assert suggested(client, 'musical') == ['The Musical Hop']
+    with app.app_context():
+        db.session.delete(Artist.query.filter_by(name='Venue Crashers').one())
+        db.session.commit()
+    assert suggested(client, 'venue') == []
+
+
+def test_suggest_ignores_rolled_back_writes(app, client, catalog):
+    catalog(venues=1, artists=1)
+    assert suggested(client, 'venue') == ['Venue 0']
+    with app.app_context():
+        db.session.add(Artist(name='Phantom Band'))
+        db.session.get(Venue, 1).name = 'Renamed'
+        db.session.flush()
+        db.session.rollback()
+    assert suggested(client, 'phantom') == []
+    assert suggested(client, 'renamed') == []
+    assert suggested(client, 'venue') == ['Venue 0']
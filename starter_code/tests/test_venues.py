@@ -0,0 +1,21 @@
+def test_venues_groups_by_state_and_city(client, catalog):
+    catalog(venues=4)
+    body = client.get('/venues').get_data(as_text=True)
+    assert body.index('New York') < body.index('San Francisco')
+    for i in range(4):
+        assert 'Venue %d' % i in body
+
+
+def test_venues_statement_count_does_not_grow_with_venues(app, client, catalog, statements):
+    # the area tree is one aggregate query whatever the number of venues and
+    # areas; the rest is the conditional-GET stamp
+    catalog(venues=2)
+    statements.clear()
+    assert client.get('/venues').status_code == 200
+    few = len(statements)
+
+    catalog(venues=30, cities=[('City %d' % i, 'S%d' % (i % 5)) for i in range(10)])
+    statements.clear()
+    assert client.get('/venues').status_code == 200
+    assert len(statements) == few
+    assert few <= app.config['QUERY_BUDGETS']['venues']